@@ -3,8 +3,11 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from typing import Optional
 import os
+import time
 from dotenv import load_dotenv
 import requests
+from database.cache import LocalCache
+from middleware.profiling import span
 
 load_dotenv()
 
@@ -60,22 +63,38 @@ class CognitoBearer(HTTPBearer):
         return credentials
 
     async def verify_jwt(self, token: str) -> bool:
-        try:
-            # Decode the token header to get the key ID (kid)
-            header = jwt.get_unverified_header(token)
-            kid = header.get('kid')
-            
-            # Find the corresponding public key from JWKS
-            key = None
-            for jwk in JWKS['keys']:
-                if jwk.get('kid') == kid:
-                    key = jwk
-                    break
-            
-            if not key:
-                return False
-
-            # Verify the token
+        return await get_verified_claims(token) is not None
+
+
+# Verified claims keyed by token, so repeated calls within a request (auth,
+# rate limiting) only pay for the signature check once
+_claims_cache = LocalCache(max_items=4096, default_ttl=60)
+
+async def get_verified_claims(token: str) -> Optional[dict]:
+    """Return the token's claims if it is a valid Cognito JWT, else None."""
+    claims = _claims_cache.get(token)
+    if isinstance(claims, dict):
+        if claims.get('exp', 0) > time.time():
+            return claims
+        _claims_cache.delete(token)
+
+    try:
+        # Decode the token header to get the key ID (kid)
+        header = jwt.get_unverified_header(token)
+        kid = header.get('kid')
+        
+        # Find the corresponding public key from JWKS
+        key = None
+        for jwk in JWKS['keys']:
+            if jwk.get('kid') == kid:
+                key = jwk
+                break
+        
+        if not key:
+            return None
+
+        # Verify the token
+        with span("auth.verify_jwt"):
             payload = jwt.decode(
                 token,
                 key,
@@ -83,10 +102,11 @@ class CognitoBearer(HTTPBearer):
                 audience=CLIENT_ID,
                 issuer=f'https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}'
             )
-            
-            return True
-        except JWTError:
-            return False
-        except Exception as e:
-            print(f"Error verifying JWT: {e}")
-            return False 
\ No newline at end of file
+
+        _claims_cache.set(token, payload)
+        return payload
+    except JWTError:
+        return None
+    except Exception as e:
+        print(f"Error verifying JWT: {e}")
+        return None
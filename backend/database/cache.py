@@ -0,0 +1,334 @@
+import os
+import json
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Sentinel so cached ``None`` values can be told apart from misses
+_MISSING = object()
+
+# Redis calls are synchronous and run on the event loop, so an unreachable
+# server must fail fast instead of stalling every request
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT_SECONDS', '0.25'))
+
+
+def redis_from_url(url: str):
+    """Redis client with short connect and read timeouts."""
+    import redis
+    return redis.Redis.from_url(
+        url,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+    )
+
+
+class LocalCache:
+    """In-process LRU cache with per-entry TTL (first tier)."""
+
+    def __init__(self, max_items: int = 1024, default_ttl: Optional[float] = 30.0):
+        self.max_items = max_items
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        """Return the cached value or ``_MISSING``."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Shared second tier speaking the Redis protocol.
+
+    Values are pickled, so the Redis instance must only be reachable by
+    trusted application workers. Any client exposing the redis-py API
+    (including ``fakeredis``) can be passed in via ``client``.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        client: Any = None,
+        channel: str = "cache-invalidation",
+        namespace: str = "app-cache:",
+        default_ttl: Optional[float] = 300.0,
+    ):
+        if client is None:
+            try:
+                client = redis_from_url(url)
+            except ImportError:
+                raise ImportError("The 'redis' package is required for the shared cache tier")
+        self.client = client
+        self.channel = channel
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._pubsub_thread = None
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}{key}"
+
+    def get(self, key: str) -> Any:
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return _MISSING
+        self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        px = int(ttl * 1000) if ttl else None
+        self.client.set(self._key(key), pickle.dumps(value), px=px)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*[self._key(key) for key in keys])
+
+    def get_generation(self, namespace: str) -> int:
+        raw = self.client.get(self._key(f"gen:{namespace}"))
+        return int(raw) if raw is not None else 0
+
+    def incr_generation(self, namespace: str) -> int:
+        return int(self.client.incr(self._key(f"gen:{namespace}")))
+
+    def clear(self) -> None:
+        """Delete every key under the namespace (scans the keyspace; not for request paths)."""
+        stale = list(self.client.scan_iter(match=f"{self.namespace}*"))
+        if stale:
+            self.client.delete(*stale)
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        self.client.publish(self.channel, json.dumps(message))
+
+    def subscribe(self, handler: Callable[[Dict[str, Any]], None]) -> None:
+        """Apply invalidation messages from other workers in a background thread."""
+        if self._pubsub_thread is not None:
+            return
+
+        def on_message(message):
+            try:
+                handler(json.loads(message["data"]))
+            except Exception as e:
+                print(f"Error applying cache invalidation: {str(e)}")
+
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: on_message})
+        self._pubsub_thread = pubsub.run_in_thread(sleep_time=0.05, daemon=True)
+
+    def close(self) -> None:
+        if self._pubsub_thread is not None:
+            self._pubsub_thread.stop()
+            self._pubsub_thread = None
+
+
+class TieredCache:
+    """Local tier backed by an optional shared tier with invalidation fan-out.
+
+    Reads check the local tier, then the shared tier (promoting hits into
+    the local tier). Invalidations drop the keys from both tiers and are
+    published so every other worker drops them from its local tier too.
+
+    Groups of keys that are invalidated together (every cached query of a
+    table, every window of a series) live under a namespace whose
+    generation is part of the key: invalidating the group is a single
+    INCR, and entries from older generations are never read again and
+    simply expire.
+    """
+
+    def __init__(self, local: Optional[LocalCache] = None, shared: Optional[RedisCache] = None):
+        self.local = local or LocalCache()
+        self.shared = shared
+        self.worker_id = uuid.uuid4().hex
+        # namespace -> (generation, monotonic time it was read from the shared tier)
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        if self.shared is not None:
+            self.shared.subscribe(self._apply_invalidation)
+
+    def after_fork(self) -> None:
+        """Re-subscribe to invalidations in a freshly forked worker.
+
+        The subscriber thread does not survive ``fork()``, and the local tier
+        inherited from the master would otherwise miss invalidations.
+        """
+        self.worker_id = uuid.uuid4().hex
+        # A lock held by a master thread at fork time would never be released
+        self.local._lock = threading.Lock()
+        self.local.clear()
+        self._generations = {}
+        if self.shared is not None:
+            self.shared._pubsub_thread = None
+            self.shared.subscribe(self._apply_invalidation)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.local.get(key)
+        if value is not _MISSING:
+            return value
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:
+                print(f"Error reading shared cache: {str(e)}")
+                value = _MISSING
+            if value is not _MISSING:
+                self.local.set(key, value)
+                return value
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, ttl)
+            except Exception as e:
+                print(f"Error writing shared cache: {str(e)}")
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Return the cached value for ``key``, calling ``loader`` on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def generation(self, namespace: str) -> int:
+        """Current generation of a namespace.
+
+        Re-read from the shared tier once the local TTL has passed, so a
+        missed invalidation message goes no staler than a local entry.
+        """
+        entry = self._generations.get(namespace)
+        now = time.monotonic()
+        if entry is not None and (
+            self.shared is None or not self.local.default_ttl or now - entry[1] < self.local.default_ttl
+        ):
+            return entry[0]
+        generation = entry[0] if entry is not None else 0
+        if self.shared is not None:
+            try:
+                generation = max(generation, self.shared.get_generation(namespace))
+            except Exception as e:
+                print(f"Error reading cache generation: {str(e)}")
+        self._generations[namespace] = (generation, now)
+        return generation
+
+    def namespace_prefix(self, namespace: str) -> str:
+        """Key prefix for entries of the namespace's current generation."""
+        return f"{namespace}:{self.generation(namespace)}:"
+
+    def invalidate(self, keys: Iterable[str] = (), namespaces: Iterable[str] = ()) -> None:
+        keys = list(keys)
+        generations = {}
+        for namespace in set(namespaces):
+            generation = self._generations.get(namespace, (0, 0.0))[0] + 1
+            if self.shared is not None:
+                try:
+                    generation = max(generation, self.shared.incr_generation(namespace))
+                except Exception as e:
+                    print(f"Error bumping cache generation: {str(e)}")
+            generations[namespace] = generation
+        self._apply_invalidation({"keys": keys, "generations": generations})
+        if self.shared is None:
+            return
+        try:
+            self.shared.delete(*keys)
+            self.shared.publish({"origin": self.worker_id, "keys": keys, "generations": generations})
+        except Exception as e:
+            print(f"Error publishing cache invalidation: {str(e)}")
+
+    def _apply_invalidation(self, message: Dict[str, Any]) -> None:
+        self.local.delete(*message.get("keys", []))
+        now = time.monotonic()
+        for namespace, generation in message.get("generations", {}).items():
+            current = self._generations.get(namespace, (0, now))[0]
+            self._generations[namespace] = (max(current, generation), now)
+
+    def clear(self) -> None:
+        self.local.clear()
+
+
+class NullCache(TieredCache):
+    """Cache that never stores anything, used when caching is disabled."""
+
+    def __init__(self):
+        self.local = LocalCache(max_items=0)
+        self.shared = None
+        self.worker_id = uuid.uuid4().hex
+        self._generations = {}
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+
+def create_cache_from_env() -> TieredCache:
+    """Build the process-wide cache from ``CACHE_*`` environment variables.
+
+    CACHE_BACKEND: ``none``, ``local`` or ``redis`` (default: ``redis`` when
+        CACHE_REDIS_URL is set, otherwise ``none``). ``local`` has no
+        invalidation fan-out, so it is only safe with a single worker.
+    CACHE_REDIS_URL: Redis URL for the shared tier
+    CACHE_TTL_SECONDS: TTL for local entries (default 30)
+    CACHE_SHARED_TTL_SECONDS: TTL for shared entries (default 300)
+    CACHE_LOCAL_MAX_ITEMS: max entries held per worker (default 1024)
+    """
+    backend = os.getenv('CACHE_BACKEND', 'redis' if os.getenv('CACHE_REDIS_URL') else 'none').lower()
+    if backend == 'none':
+        return NullCache()
+
+    local = LocalCache(
+        max_items=int(os.getenv('CACHE_LOCAL_MAX_ITEMS', '1024')),
+        default_ttl=float(os.getenv('CACHE_TTL_SECONDS', '30')),
+    )
+    if backend != 'redis':
+        return TieredCache(local)
+
+    try:
+        shared = RedisCache(
+            url=os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'),
+            default_ttl=float(os.getenv('CACHE_SHARED_TTL_SECONDS', '300')),
+        )
+        print("Initialized two-tier cache with shared Redis backend")
+        return TieredCache(local, shared)
+    except Exception as e:
+        # A local tier alone would serve stale reads across workers
+        print(f"Error initializing shared cache, caching disabled: {str(e)}")
+        return NullCache()
+
+
+# Create a singleton instance
+cache = create_cache_from_env()
@@ -1,25 +1,54 @@
 import os
+import json
+import time
+import asyncio
 import boto3
-from typing import Any, Dict, List, Optional, Literal
+from typing import Any, Dict, List, Optional, Literal, Tuple
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from database.cache import cache, TieredCache
+from database.single_table import (
+    ENTITY_TYPES, INVERTED_INDEX, entity_key, group_customer_partition, partition_filter,
+    to_single_table_item
+)
+from middleware.profiling import span
 
 # Define valid table names as a literal type
-TableName = Literal['users', 'sites', 'customers']
+TableName = Literal['users', 'sites', 'customers', 'measurements', 'single']
 
 class DynamoDBClient:
     # Table name constants
     USERS_TABLE = 'users'
     SITES_TABLE = 'sites'
     CUSTOMERS_TABLE = 'customers'
+    MEASUREMENTS_TABLE = 'measurements'
+    SINGLE_TABLE = 'single'
+
+    # BatchWriteItem accepts at most 25 put/delete requests per call
+    BATCH_WRITE_SIZE = 25
+
+    # Larger scan/query results are not cached: each cached copy is pickled
+    # into one Redis value and held in every worker's local tier
+    CACHE_MAX_ITEMS = int(os.getenv('CACHE_MAX_RESULT_ITEMS', '1000'))
+
+    # Enough pooled connections for concurrent batch writes from worker threads
+    BOTO_CONFIG = Config(max_pool_connections=int(os.getenv('DYNAMODB_MAX_POOL_CONNECTIONS', '32')))
 
     # Environment variable mapping
     TABLE_ENV_VARS = {
         USERS_TABLE: 'DYNAMODB_USERS_TABLE',
         SITES_TABLE: 'DYNAMODB_SITES_TABLE',
-        CUSTOMERS_TABLE: 'DYNAMODB_CUSTOMERS_TABLE'
+        CUSTOMERS_TABLE: 'DYNAMODB_CUSTOMERS_TABLE',
+        MEASUREMENTS_TABLE: 'DYNAMODB_MEASUREMENTS_TABLE'
+    }
+
+    # Tables that are only used when configured
+    OPTIONAL_TABLE_ENV_VARS = {
+        SINGLE_TABLE: 'DYNAMODB_SINGLE_TABLE'
     }
 
-    def __init__(self):
+    def __init__(self, cache: TieredCache = cache):
+        self.cache = cache
         try:
             # Validate required environment variables
             required_env_vars = [
@@ -34,15 +63,24 @@ class DynamoDBClient:
             self.region = os.getenv('AWS_REGION')
             print(f"Initializing DynamoDB client in region: {self.region}")
 
+            # "single" serves customer reads from the single table; writes go to both layouts
+            self.table_layout = os.getenv('DYNAMODB_TABLE_LAYOUT', 'multi')
+            if self.table_layout not in ('multi', 'single'):
+                raise ValueError(f"DYNAMODB_TABLE_LAYOUT must be 'multi' or 'single', got '{self.table_layout}'")
+            if self.table_layout == 'single' and not os.getenv('DYNAMODB_SINGLE_TABLE'):
+                raise ValueError("DYNAMODB_TABLE_LAYOUT=single requires DYNAMODB_SINGLE_TABLE")
+
             self.dynamodb = boto3.resource(
                 'dynamodb',
-                region_name=self.region
+                region_name=self.region,
+                config=self.BOTO_CONFIG
             )
 
             # Initialize tables with environment variables
             self.tables = {
                 table_name: self.dynamodb.Table(os.getenv(env_var))
-                for table_name, env_var in self.TABLE_ENV_VARS.items()
+                for table_name, env_var in {**self.TABLE_ENV_VARS, **self.OPTIONAL_TABLE_ENV_VARS}.items()
+                if os.getenv(env_var)
             }
 
             # Store actual table names for reference
@@ -63,13 +101,29 @@ class DynamoDBClient:
         except Exception as e:
             raise Exception(f"Failed to initialize DynamoDB client: {str(e)}")
 
+    def reset_connections(self):
+        """Rebuild the boto3 resource and tables.
+
+        boto3 sessions and their connection pools are not fork-safe, so each
+        worker forked from a preloaded master calls this before serving.
+        """
+        self.dynamodb = boto3.resource(
+            'dynamodb',
+            region_name=self.region,
+            config=self.BOTO_CONFIG
+        )
+        self.tables = {
+            table_name: self.dynamodb.Table(actual_name)
+            for table_name, actual_name in self.actual_table_names.items()
+        }
+
     def get_table(self, table_name: TableName):
         """Get a table by name."""
         table = self.tables.get(table_name)
         if not table:
             raise ValueError(
                 f"Invalid table name: '{table_name}'. "
-                f"Must be one of: {list(self.TABLE_ENV_VARS.keys())}. "
+                f"Must be one of: {list(self.tables.keys())}. "
                 f"Actual table names are: {self.actual_table_names}"
             )
         return table
@@ -78,12 +132,42 @@ class DynamoDBClient:
         """Get the actual DynamoDB table name for a logical table name."""
         return self.actual_table_names[table_name]
 
+    @property
+    def single_table_enabled(self) -> bool:
+        return self.SINGLE_TABLE in self.tables
+
+    @staticmethod
+    def _item_cache_key(table_name: TableName, key: Dict[str, Any]) -> str:
+        return f"ddb:{table_name}:item:{json.dumps(key, sort_keys=True, default=str)}"
+
+    def _read_cache_prefix(self, table_name: TableName) -> str:
+        """Prefix shared by all cached scan/query results for a table.
+
+        It carries the table's cache generation, so invalidating every
+        cached read of the table is a single counter bump.
+        """
+        return self.cache.namespace_prefix(f"ddb:{table_name}:read")
+
+    def invalidate_cache(self, table_name: TableName, key: Optional[Dict[str, Any]] = None):
+        """Drop cached reads for a table (and one item) on every worker."""
+        keys = [self._item_cache_key(table_name, key)] if key else []
+        self.cache.invalidate(keys=keys, namespaces=[f"ddb:{table_name}:read"])
+
     async def get_item(self, table_name: TableName, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Get an item from a table by its key."""
         try:
+            cache_key = self._item_cache_key(table_name, key)
+            item = self.cache.get(cache_key)
+            if item is not None:
+                return item
+
             table = self.get_table(table_name)
-            response = table.get_item(Key=key)
-            return response.get('Item')
+            with span("dynamodb.get_item", table_name):
+                response = table.get_item(Key=key)
+            item = response.get('Item')
+            if item is not None:
+                self.cache.set(cache_key, item)
+            return item
         except ClientError as e:
             print(f"Error getting item from {self.get_actual_table_name(table_name)}: {str(e)}")
             return None
@@ -102,28 +186,87 @@ class DynamoDBClient:
             if existing_item:
                 print(f"Warning: Overwriting existing item with id {item['id']} in {self.get_actual_table_name(table_name)}")
             
-            table.put_item(Item=item)
+            with span("dynamodb.put_item", table_name):
+                table.put_item(Item=item)
+            self.invalidate_cache(table_name, {'id': item['id']})
+            await self._mirror_put(table_name, item)
             return True
         except ClientError as e:
             print(f"Error putting item into {self.get_actual_table_name(table_name)}: {str(e)}")
             return False
 
+    async def batch_write_items(
+        self,
+        table_name: TableName,
+        items: List[Dict[str, Any]],
+        key_names: Tuple[str, ...] = ('id',),
+        max_concurrency: int = 4,
+        max_retries: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Put many items with concurrent BatchWriteItem calls.
+
+        Items sharing a key are collapsed (last one wins), since DynamoDB
+        rejects batches containing duplicate keys. Returns the items that
+        could not be written after retries so callers can requeue them.
+        """
+        table = self.get_table(table_name)
+        unique = list({tuple(item[k] for k in key_names): item for item in items}.values())
+        chunks = [
+            unique[i:i + self.BATCH_WRITE_SIZE]
+            for i in range(0, len(unique), self.BATCH_WRITE_SIZE)
+        ]
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def write_chunk(chunk):
+            async with semaphore:
+                # The low-level client is thread-safe, so chunks run in parallel threads
+                return await asyncio.to_thread(self._write_chunk, table, chunk, max_retries)
+
+        results = await asyncio.gather(*(write_chunk(chunk) for chunk in chunks))
+        # Measurements are never read through the table cache; their
+        # rendered series are invalidated by the ingestion path
+        if table_name != self.MEASUREMENTS_TABLE:
+            self.invalidate_cache(table_name)
+        return [item for unwritten in results for item in unwritten]
+
+    def _write_chunk(self, table, chunk: List[Dict[str, Any]], max_retries: int) -> List[Dict[str, Any]]:
+        """Write one BatchWriteItem chunk, retrying unprocessed items with backoff."""
+        request = {table.table_name: [{'PutRequest': {'Item': item}} for item in chunk]}
+        for attempt in range(max_retries + 1):
+            try:
+                with span("dynamodb.batch_write_item", table.table_name):
+                    response = table.meta.client.batch_write_item(RequestItems=request)
+                request = response.get('UnprocessedItems') or {}
+                if not request:
+                    return []
+            except ClientError as e:
+                print(f"Error batch writing to {table.table_name}: {str(e)}")
+            time.sleep(min(0.05 * 2 ** attempt, 2.0))
+        return [entry['PutRequest']['Item'] for entry in request.get(table.table_name, [])]
+
     async def scan_table(self, table_name: TableName, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Scan a table with optional pagination."""
         try:
+            cache_key = f"{self._read_cache_prefix(table_name)}scan:{limit}"
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
             table = self.get_table(table_name)
             params = {}
             if limit:
                 params['Limit'] = limit
             
             items = []
-            response = table.scan(**params)
+            with span("dynamodb.scan", table_name):
+                response = table.scan(**params)
             items.extend(response.get('Items', []))
 
             # Handle pagination if there are more items
             while 'LastEvaluatedKey' in response:
                 params['ExclusiveStartKey'] = response['LastEvaluatedKey']
-                response = table.scan(**params)
+                with span("dynamodb.scan", table_name):
+                    response = table.scan(**params)
                 items.extend(response.get('Items', []))
                 
                 # If we have a limit and we've reached it, stop
@@ -131,6 +274,8 @@ class DynamoDBClient:
                     items = items[:limit]
                     break
 
+            if len(items) <= self.CACHE_MAX_ITEMS:
+                self.cache.set(cache_key, items)
             return items
         except ClientError as e:
             print(f"Error scanning table {self.get_actual_table_name(table_name)}: {str(e)}")
@@ -146,6 +291,15 @@ class DynamoDBClient:
     ) -> List[Dict[str, Any]]:
         """Query items using a GSI."""
         try:
+            cache_key = self._read_cache_prefix(table_name) + "query:" + json.dumps(
+                [index_name, key_condition_expression, expression_attribute_values, expression_attribute_names],
+                sort_keys=True,
+                default=str
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
             table = self.get_table(table_name)
             params = {
                 'IndexName': index_name,
@@ -155,12 +309,55 @@ class DynamoDBClient:
             if expression_attribute_names:
                 params['ExpressionAttributeNames'] = expression_attribute_names
 
-            response = table.query(**params)
-            return response.get('Items', [])
+            # Follow LastEvaluatedKey: one page stops at 1MB of items
+            items = []
+            while True:
+                with span("dynamodb.query", table_name):
+                    response = table.query(**params)
+                items.extend(response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    break
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            if len(items) <= self.CACHE_MAX_ITEMS:
+                self.cache.set(cache_key, items)
+            return items
         except ClientError as e:
             print(f"Error querying {self.get_actual_table_name(table_name)} with index {index_name}: {str(e)}")
             return []
 
+    async def query_table(
+        self,
+        table_name: TableName,
+        key_condition_expression: str,
+        expression_attribute_values: Dict[str, Any],
+        expression_attribute_names: Optional[Dict[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Query a table by its primary key, following pagination.
+
+        Results are not cached here since a partition can be large; callers
+        cache what they derive from it.
+        """
+        try:
+            table = self.get_table(table_name)
+            params = {
+                'KeyConditionExpression': key_condition_expression,
+                'ExpressionAttributeValues': expression_attribute_values,
+            }
+            if expression_attribute_names:
+                params['ExpressionAttributeNames'] = expression_attribute_names
+
+            items = []
+            while True:
+                with span("dynamodb.query", table_name):
+                    response = await asyncio.to_thread(table.query, **params)
+                items.extend(response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    return items
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            print(f"Error querying {self.get_actual_table_name(table_name)}: {str(e)}")
+            return []
+
     async def update_item(
         self,
         table_name: TableName,
@@ -180,7 +377,10 @@ class DynamoDBClient:
             if expression_attribute_names:
                 params['ExpressionAttributeNames'] = expression_attribute_names
 
-            table.update_item(**params)
+            with span("dynamodb.update_item", table_name):
+                response = table.update_item(ReturnValues='ALL_NEW', **params)
+            self.invalidate_cache(table_name, key)
+            await self._mirror_put(table_name, response['Attributes'])
             return True
         except ClientError as e:
             print(f"Error updating item in {self.get_actual_table_name(table_name)}: {str(e)}")
@@ -190,12 +390,134 @@ class DynamoDBClient:
         """Delete an item from a table."""
         try:
             table = self.get_table(table_name)
-            table.delete_item(Key=key)
+            with span("dynamodb.delete_item", table_name):
+                table.delete_item(Key=key)
+            self.invalidate_cache(table_name, key)
+            await self._mirror_delete(table_name, key)
             return True
         except ClientError as e:
             print(f"Error deleting item from {self.get_actual_table_name(table_name)}: {str(e)}")
             return False
 
+    async def _find_in_single_table(self, table_name: TableName, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Locate an entity in the single table through the inverted index."""
+        table = self.get_table(self.SINGLE_TABLE)
+        with span("dynamodb.query", self.SINGLE_TABLE):
+            response = table.query(
+                IndexName=INVERTED_INDEX,
+                KeyConditionExpression='SK = :sk',
+                ExpressionAttributeValues={':sk': entity_key(ENTITY_TYPES[table_name], entity_id)}
+            )
+        items = response.get('Items', [])
+        return items[0] if items else None
+
+    async def _mirror_put(self, table_name: TableName, item: Dict[str, Any]):
+        """Copy a customer, site or user write into the single table, if configured.
+
+        A site or user whose ``customer_id`` changed moves partitions, so the
+        copy under its previous owner is removed in the same transaction.
+        Failures are logged, not raised: the per-entity table stays the
+        source of truth and the migration tool can re-sync the copy.
+        """
+        if not self.single_table_enabled or table_name not in ENTITY_TYPES:
+            return
+        try:
+            table = self.get_table(self.SINGLE_TABLE)
+            new_item = to_single_table_item(table_name, item)
+            previous = None
+            if table_name != self.CUSTOMERS_TABLE:
+                previous = await self._find_in_single_table(table_name, item['id'])
+            with span("dynamodb.put_item", self.SINGLE_TABLE):
+                if previous and previous['PK'] != new_item['PK']:
+                    # The resource's client (de)serializes attribute values like the Table API
+                    table.meta.client.transact_write_items(TransactItems=[
+                        {'Delete': {'TableName': table.table_name, 'Key': {'PK': previous['PK'], 'SK': previous['SK']}}},
+                        {'Put': {'TableName': table.table_name, 'Item': new_item}},
+                    ])
+                else:
+                    table.put_item(Item=new_item)
+            self.invalidate_cache(self.SINGLE_TABLE)
+        except ClientError as e:
+            print(f"Error mirroring {table_name} item {item.get('id')} into the single table: {str(e)}")
+
+    async def _mirror_delete(self, table_name: TableName, key: Dict[str, Any]):
+        if not self.single_table_enabled or table_name not in ENTITY_TYPES:
+            return
+        try:
+            if table_name == self.CUSTOMERS_TABLE:
+                # Children keep their customer_id and stay in the partition, as in the per-entity tables
+                sort_key = entity_key('customer', key['id'])
+                existing = {'PK': sort_key, 'SK': sort_key}
+            else:
+                existing = await self._find_in_single_table(table_name, key['id'])
+            if existing:
+                with span("dynamodb.delete_item", self.SINGLE_TABLE):
+                    self.get_table(self.SINGLE_TABLE).delete_item(Key={'PK': existing['PK'], 'SK': existing['SK']})
+                self.invalidate_cache(self.SINGLE_TABLE)
+        except ClientError as e:
+            print(f"Error mirroring delete of {table_name} item {key.get('id')} into the single table: {str(e)}")
+
+    async def get_customer_with_related(
+        self,
+        customer_id: str,
+        include: Tuple[str, ...] = ()
+    ) -> Optional[Dict[str, Any]]:
+        """A customer with the sites and/or users that belong to it.
+
+        Returns ``{'customer': item, 'sites': [...], 'users': [...]}`` with
+        only the requested related lists, or None if the customer does not
+        exist. In the single-table layout this is one Query on the customer's
+        partition; otherwise a GetItem plus one ``customer-index`` query per
+        related table.
+        """
+        if self.table_layout != 'single':
+            customer = await self.get_item(self.CUSTOMERS_TABLE, {'id': customer_id})
+            if customer is None:
+                return None
+            related = {
+                table: await self.query_by_index(table, 'customer-index', 'customer_id = :id', {':id': customer_id})
+                for table in include
+            }
+            return {'customer': customer, **related}
+
+        try:
+            cache_key = f"{self._read_cache_prefix(self.SINGLE_TABLE)}customer:{customer_id}:{','.join(sorted(include))}"
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            table = self.get_table(self.SINGLE_TABLE)
+            params = {
+                'KeyConditionExpression': 'PK = :pk',
+                'ExpressionAttributeValues': {':pk': entity_key('customer', customer_id)},
+            }
+            if not include:
+                params['KeyConditionExpression'] += ' AND SK = :pk'
+            else:
+                entity_types = partition_filter(include)
+                if entity_types:
+                    # Filtered items still consume read capacity, but stay off the wire
+                    placeholders = [f":type{i}" for i in range(len(entity_types))]
+                    params['FilterExpression'] = f"entity_type IN ({', '.join(placeholders)})"
+                    params['ExpressionAttributeValues'].update(dict(zip(placeholders, entity_types)))
+
+            items = []
+            while True:
+                with span("dynamodb.query", self.SINGLE_TABLE):
+                    response = table.query(**params)
+                items.extend(response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    break
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+            result = group_customer_partition(customer_id, items, include)
+            if result is not None:
+                self.cache.set(cache_key, result)
+            return result
+        except ClientError as e:
+            print(f"Error querying {self.get_actual_table_name(self.SINGLE_TABLE)} for customer {customer_id}: {str(e)}")
+            return None
+
     async def get_table_info(self, table_name: TableName) -> Dict[str, Any]:
         """Get detailed information about a table."""
         try:
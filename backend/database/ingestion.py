@@ -0,0 +1,178 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from database.dynamodb import dynamodb_client, DynamoDBClient
+from database.series import invalidate_series
+
+
+class IngestionBuffer:
+    """Bounded in-process write-behind buffer.
+
+    Points are accepted into memory and written in batches by a background
+    task whenever ``batch_size`` points are waiting or ``flush_interval``
+    seconds have passed, whichever comes first. ``offer`` refuses a request
+    outright when it would overflow ``max_points`` so callers can apply
+    backpressure. ``stop`` keeps retrying everything that was accepted, with
+    backoff, for up to ``drain_timeout`` seconds; points still unwritten
+    after that are logged and counted as dropped.
+    """
+
+    # Longest pause between write attempts while draining at shutdown
+    MAX_RETRY_DELAY = 8.0
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]],
+        max_points: int = 100_000,
+        batch_size: int = 1_000,
+        flush_interval: float = 1.0,
+        drain_timeout: float = 25.0,
+    ):
+        self.write_batch = write_batch
+        self.max_points = max_points
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drain_timeout = drain_timeout
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Metrics
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self._flush_latencies: Deque[float] = deque(maxlen=256)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def offer(self, points: List[Dict[str, Any]]) -> bool:
+        """Accept all points or none; returns False when the buffer is full.
+
+        Callers should reject batches larger than ``max_points`` up front:
+        those can never be accepted, however long the client waits.
+        """
+        if self._stopping or len(self._queue) + len(points) > self.max_points:
+            self.rejected += len(points)
+            return False
+        self._queue.extend(points)
+        self.accepted += len(points)
+        if self._wakeup is not None and len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting points and flush everything already accepted."""
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+        deadline = time.monotonic() + self.drain_timeout
+        delay = self.flush_interval
+        while self._queue and time.monotonic() < deadline:
+            if await self.flush():
+                delay = self.flush_interval
+                continue
+            await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, self.MAX_RETRY_DELAY)
+
+        if self._queue:
+            lost = len(self._queue)
+            self._queue.clear()
+            self.dropped += lost
+            print(f"Dropped {lost} buffered measurements that could not be written within {self.drain_timeout}s of shutdown")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._drain()
+
+    async def _drain(self):
+        """Flush until the queue is empty or a flush writes nothing; failures wait for the next tick."""
+        while self._queue:
+            if not await self.flush():
+                return
+
+    async def flush(self) -> int:
+        """Write up to ``batch_size`` queued points; returns how many were written."""
+        batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        if not batch:
+            return 0
+        start = time.perf_counter()
+        try:
+            unwritten = await self.write_batch(batch)
+        except Exception as e:
+            print(f"Error flushing ingestion buffer: {str(e)}")
+            unwritten = batch
+        self._flush_latencies.append(time.perf_counter() - start)
+        self.flushes += 1
+        self.written += len(batch) - len(unwritten)
+
+        if unwritten:
+            # Requeue at the front so failed points are retried first, as long
+            # as that keeps the buffer within its bound
+            room = self.max_points - len(self._queue)
+            self._queue.extendleft(reversed(unwritten[:room]))
+            self.dropped += max(len(unwritten) - room, 0)
+        return len(batch) - len(unwritten)
+
+    def metrics(self) -> Dict[str, Any]:
+        latencies = sorted(self._flush_latencies)
+        return {
+            "queue_depth": len(self._queue),
+            "max_points": self.max_points,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flush_latency_ms": {
+                "last": round(self._flush_latencies[-1] * 1000, 3) if latencies else None,
+                "avg": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+                "p99": round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000, 3) if latencies else None,
+            },
+        }
+
+
+async def write_measurements(points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    unwritten = await dynamodb_client.batch_write_items(
+        DynamoDBClient.MEASUREMENTS_TABLE,
+        points,
+        key_names=('series_id', 'timestamp'),
+        max_concurrency=int(os.getenv('INGEST_MAX_CONCURRENT_WRITES', '8'))
+    )
+    # Charts covering these points are stale now
+    invalidate_series(points)
+    return unwritten
+
+
+# Create a singleton instance
+measurement_buffer = IngestionBuffer(
+    write_measurements,
+    max_points=int(os.getenv('INGEST_MAX_BUFFERED_POINTS', '100000')),
+    batch_size=int(os.getenv('INGEST_BATCH_SIZE', '1000')),
+    flush_interval=float(os.getenv('INGEST_FLUSH_INTERVAL_SECONDS', '1')),
+    # Finish before gunicorn's graceful timeout kills the worker
+    drain_timeout=float(os.getenv(
+        'INGEST_DRAIN_TIMEOUT_SECONDS',
+        str(max(float(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30')) - 5, 1))
+    ))
+)
@@ -1,11 +1,13 @@
-from pydantic import BaseModel, EmailStr, HttpUrl
-from typing import Optional
+from pydantic import BaseModel, EmailStr, FiniteFloat, HttpUrl
+from typing import Dict, List, Optional
 from uuid import UUID, uuid4
-from datetime import datetime
+from datetime import datetime, timezone
+from decimal import Decimal
 
 class User(BaseModel):
     id: str = None
     email: EmailStr
+    customer_id: Optional[str] = None
     created_at: str = None
     updated_at: str = None
 
@@ -29,6 +31,7 @@ class User(BaseModel):
 class Site(BaseModel):
     id: str = None
     name: str
+    customer_id: Optional[str] = None
     created_at: str = None
     updated_at: str = None
 
@@ -79,4 +82,36 @@ class Customer(BaseModel):
 
     model_config = {
         "from_attributes": True
-    }
\ No newline at end of file
+    }
+
+class CustomerWithRelated(Customer):
+    """A customer with the related records requested through ``include``."""
+    sites: Optional[List[Site]] = None
+    users: Optional[List[User]] = None
+
+# Measurement timestamps are stored in one fixed-width UTC format, so the
+# sort key orders (and range conditions compare) correctly as strings
+MEASUREMENT_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+def format_measurement_timestamp(value: datetime) -> str:
+    """Format a timestamp for the measurements sort key; naive values are taken as UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime(MEASUREMENT_TIMESTAMP_FORMAT)
+
+
+class Measurement(BaseModel):
+    """A single sensor reading uploaded by a field gateway."""
+    timestamp: datetime
+    values: Dict[str, FiniteFloat]
+
+    def to_item(self, site_id: str, gt_id: str) -> dict:
+        # DynamoDB stores numbers as Decimal; str() avoids binary float noise
+        return {
+            'series_id': f"{site_id}#{gt_id}",
+            'timestamp': format_measurement_timestamp(self.timestamp),
+            'site_id': site_id,
+            'gt_id': gt_id,
+            'values': {name: Decimal(str(value)) for name, value in self.values.items()}
+        }
@@ -0,0 +1,127 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+from database.cache import cache
+from database.downsampling import downsample_indices
+from database.dynamodb import dynamodb_client, DynamoDBClient
+from database.models import format_measurement_timestamp
+from middleware.profiling import span
+
+# Rendered series are invalidated on ingest, so they can live longer than reads
+SERIES_CACHE_TTL = float(os.getenv('SERIES_CACHE_TTL_SECONDS', '300'))
+
+# Windows that ended longer ago than this are "settled": live ingestion
+# writes newer points, so they keep their cache while recent windows churn
+SERIES_SETTLED_AFTER = float(os.getenv('SERIES_SETTLED_AFTER_SECONDS', '3600'))
+
+
+def series_cache_namespace(series_id: str, settled: bool = False) -> str:
+    """Cache namespace of a series' recent (or open-ended) or settled windows."""
+    return f"series:{series_id}:{'settled' if settled else 'recent'}"
+
+
+def settled_cutoff() -> str:
+    """Windows ending before this stored-format timestamp are settled."""
+    return format_measurement_timestamp(datetime.now(timezone.utc) - timedelta(seconds=SERIES_SETTLED_AFTER))
+
+
+def invalidate_series(points: Iterable[Dict[str, Any]]):
+    """Drop cached renders that the written points can change, on every worker.
+
+    Recent and open-ended windows are always dropped. A settled window
+    ended before the cutoff when it was cached, so only a point older than
+    the current cutoff can fall inside it; settled windows are only dropped
+    for such late points.
+    """
+    oldest: Dict[str, str] = {}
+    for point in points:
+        series_id, timestamp = point['series_id'], point['timestamp']
+        if series_id not in oldest or timestamp < oldest[series_id]:
+            oldest[series_id] = timestamp
+    cutoff = settled_cutoff()
+    namespaces = []
+    for series_id, timestamp in oldest.items():
+        namespaces.append(series_cache_namespace(series_id))
+        if timestamp < cutoff:
+            namespaces.append(series_cache_namespace(series_id, settled=True))
+    if namespaces:
+        cache.invalidate(namespaces=namespaces)
+
+
+def render_series(items: List[Dict[str, Any]], max_points: Optional[int], mode: str) -> Dict[str, Any]:
+    """Columnar view of measurement items, one column per reading name.
+
+    With ``max_points`` each column is downsampled on its own so every
+    trace keeps its shape; timestamps are returned as stored.
+    """
+    columns = {}
+    names = sorted({name for item in items for name in item.get('values', {})})
+    for name in names:
+        rows = [(item['timestamp'], item['values'][name]) for item in items if name in item.get('values', {})]
+        timestamps = [timestamp for timestamp, _ in rows]
+        values = np.array([float(value) for _, value in rows], dtype=np.float64)
+        x = pd.to_datetime(timestamps, utc=True, format='ISO8601').asi8.astype(np.float64) / 1e9
+        order = np.argsort(x, kind='stable')
+        if max_points and len(order) > max_points:
+            with span("downsample", mode):
+                keep = order[downsample_indices(x[order], values[order], max_points, mode)]
+        else:
+            keep = order
+        columns[name] = {
+            "timestamps": [timestamps[i] for i in keep],
+            "values": values[keep].tolist(),
+            "total_points": len(rows),
+        }
+    return {
+        "mode": mode if max_points else None,
+        "max_points": max_points,
+        "columns": columns,
+    }
+
+
+async def get_series(
+    series_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: Optional[int] = None,
+    mode: str = 'lttb'
+) -> Dict[str, Any]:
+    """Readings of one series within [start, end], rendered at the requested resolution.
+
+    Only downsampled renders are cached: a full-resolution window can be
+    arbitrarily large.
+    """
+    # Bounds must use the stored format, as the sort key compares as a string
+    start_key = format_measurement_timestamp(start) if start else ''
+    end_key = format_measurement_timestamp(end) if end else ''
+    namespace = series_cache_namespace(series_id, settled=bool(end_key) and end_key < settled_cutoff())
+    cache_key = f"{cache.namespace_prefix(namespace)}{start_key}:{end_key}:{max_points}:{mode}"
+    if max_points:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    condition = "series_id = :series_id"
+    values: Dict[str, Any] = {":series_id": series_id}
+    if start and end:
+        condition += " AND #ts BETWEEN :start AND :end"
+        values.update({":start": start_key, ":end": end_key})
+    elif start:
+        condition += " AND #ts >= :start"
+        values[":start"] = start_key
+    elif end:
+        condition += " AND #ts <= :end"
+        values[":end"] = end_key
+    items = await dynamodb_client.query_table(
+        DynamoDBClient.MEASUREMENTS_TABLE,
+        condition,
+        values,
+        expression_attribute_names={"#ts": "timestamp"} if start or end else None
+    )
+
+    series = render_series(items, max_points, mode)
+    if max_points:
+        cache.set(cache_key, series, ttl=SERIES_CACHE_TTL)
+    return series
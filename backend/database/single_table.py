@@ -0,0 +1,85 @@
+"""Key scheme for the optional single-table layout.
+
+Customers, sites and users share one table as an adjacency list. A
+customer's own item and every site and user that belongs to it (through
+``customer_id``) live in the customer's partition, so one Query returns
+the customer with its related records:
+
+    PK               SK               entity_type
+    CUSTOMER#<id>    CUSTOMER#<id>    customer
+    CUSTOMER#<id>    SITE#<site_id>   site
+    CUSTOMER#<id>    USER#<user_id>   user
+
+Sites and users without a customer get a partition of their own. The
+inverted index (SK as partition key, PK as sort key) finds any entity by
+its id without knowing its owner.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+# Logical table name -> entity type stored in the single table
+ENTITY_TYPES = {
+    'customers': 'customer',
+    'sites': 'site',
+    'users': 'user',
+}
+
+# Related record types that can be folded into a customer read
+RELATED_TYPES = ('sites', 'users')
+
+INVERTED_INDEX = 'inverted-index'
+OWNER_ATTRIBUTE = 'customer_id'
+KEY_ATTRIBUTES = ('PK', 'SK', 'entity_type')
+
+
+def entity_key(entity_type: str, entity_id: str) -> str:
+    return f"{entity_type.upper()}#{entity_id}"
+
+
+def to_single_table_item(table_name: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of an item from a per-entity table with its single-table keys."""
+    entity_type = ENTITY_TYPES[table_name]
+    sort_key = entity_key(entity_type, item['id'])
+    owner = item.get(OWNER_ATTRIBUTE) if entity_type != 'customer' else None
+    return {
+        **item,
+        'PK': entity_key('customer', owner) if owner else sort_key,
+        'SK': sort_key,
+        'entity_type': entity_type,
+    }
+
+
+def from_single_table_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip the single-table keys so the item matches the per-entity tables."""
+    return {name: value for name, value in item.items() if name not in KEY_ATTRIBUTES}
+
+
+def group_customer_partition(
+    customer_id: str,
+    items: Iterable[Dict[str, Any]],
+    include: Iterable[str] = ()
+) -> Optional[Dict[str, Any]]:
+    """Split a customer partition into the customer and its related records.
+
+    Returns None when the partition has no customer item (unknown id, or
+    only orphaned children left behind).
+    """
+    grouped: Dict[str, Any] = {table: [] for table in include}
+    types = {entity_type: table for table, entity_type in ENTITY_TYPES.items()}
+    customer = None
+    for item in items:
+        table = types.get(item.get('entity_type'))
+        if table == 'customers' and item['SK'] == entity_key('customer', customer_id):
+            customer = from_single_table_item(item)
+        elif table in grouped:
+            grouped[table].append(from_single_table_item(item))
+    if customer is None:
+        return None
+    return {'customer': customer, **grouped}
+
+
+def partition_filter(include: Iterable[str]) -> Optional[List[str]]:
+    """Entity types to keep from a customer partition, or None to keep all."""
+    include = set(include)
+    if include.issuperset(RELATED_TYPES):
+        return None
+    return ['customer'] + [ENTITY_TYPES[table] for table in RELATED_TYPES if table in include]
@@ -0,0 +1,112 @@
+"""Production serving mode: gunicorn master with one uvicorn worker per core.
+
+Run from backend/ with:
+    gunicorn -c gunicorn.conf.py main:app
+
+Environment variables:
+    WEB_CONCURRENCY: fixed worker count (default: auto-sized from available cores)
+    GUNICORN_WORKERS_PER_CORE: workers per core when auto-sizing (default 1)
+    GUNICORN_MAX_REQUESTS: recycle a worker after this many requests (default 1000, 0 disables)
+    GUNICORN_MAX_REQUESTS_JITTER: random jitter so workers do not recycle together (default 100)
+    GUNICORN_TIMEOUT / GUNICORN_GRACEFUL_TIMEOUT: worker timeouts in seconds (default 60 / 30)
+"""
+import gc
+import os
+import math
+
+
+def available_cores() -> int:
+    """CPU cores this container may use, honouring affinity and cgroup quotas."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    # cgroup v2 quota, e.g. "100000 100000" for one vCPU or "max 100000"
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cores = min(cores, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cores, 1)
+
+
+def auto_worker_count() -> int:
+    if os.getenv('WEB_CONCURRENCY'):
+        return max(int(os.getenv('WEB_CONCURRENCY')), 1)
+    per_core = float(os.getenv('GUNICORN_WORKERS_PER_CORE', '1'))
+    return max(int(available_cores() * per_core), 1)
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = auto_worker_count()
+
+# The local cache tier is per process: other workers would keep serving
+# reads that one worker has just invalidated
+if workers > 1 and os.getenv('CACHE_BACKEND', '').lower() == 'local':
+    raise SystemExit("CACHE_BACKEND=local cannot be used with more than one worker; use redis or none")
+
+# Import the app (pandas, plotly, boto3, JWKS, ...) once in the master so
+# workers share those pages copy-on-write instead of each loading them
+preload_app = True
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+# Share the recycling threshold with the workers so /health can report it,
+# and the graceful timeout so shutdown work can finish within it
+os.environ['GUNICORN_MAX_REQUESTS'] = str(max_requests)
+os.environ['GUNICORN_GRACEFUL_TIMEOUT'] = str(graceful_timeout)
+
+
+def when_ready(server):
+    """Run one-off startup tasks once in the master instead of in every worker."""
+    import asyncio
+    import shutil
+    from middleware.profiling import profiler
+    from middleware.worker_stats import STATS_DIR
+    from scripts.on_startup import seed_example_customers
+
+    # Drop heartbeats left behind by a previous master
+    shutil.rmtree(STATS_DIR, ignore_errors=True)
+    # Sampling rates are runtime settings; start every deployment without them
+    profiler.clear_route_rates()
+
+    asyncio.run(seed_example_customers())
+    os.environ['SKIP_STARTUP_TASKS'] = 'true'
+    server.log.info(f"Serving with {server.num_workers} workers on {available_cores()} cores")
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach so collections
+    # in the workers do not touch (and un-share) the preloaded pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from database.cache import cache
+    from database.dynamodb import dynamodb_client
+    from middleware.worker_stats import worker_stats
+
+    dynamodb_client.reset_connections()
+    cache.after_fork()
+    worker_stats.reset()
+    worker_stats.heartbeat()
+
+
+def child_exit(server, worker):
+    from middleware.worker_stats import STATS_DIR
+
+    try:
+        os.remove(os.path.join(STATS_DIR, f"{worker.pid}.json"))
+    except OSError:
+        pass
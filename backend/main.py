@@ -1,10 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import health, users, data, customers
+from routes import health, users, data, customers, profiling
 from dotenv import load_dotenv
 import os
 import uvicorn
 from scripts.on_startup import seed_example_customers
+from database.ingestion import measurement_buffer
+from middleware.worker_stats import WorkerStatsMiddleware, worker_stats
+from middleware.compression import CompressionMiddleware
 
 # Load environment variables
 load_dotenv()
@@ -25,17 +28,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (br, zstd or gzip)
+app.add_middleware(CompressionMiddleware)
+
+# Track per-worker request counts for /health
+app.add_middleware(WorkerStatsMiddleware)
+
 # Include routers
 app.include_router(health.router)
 app.include_router(users.router)
 app.include_router(data.router)
 app.include_router(customers.router)
+app.include_router(profiling.router)
 
 @app.on_event("startup")
 async def startup_event():
     """Run startup tasks."""
+    await measurement_buffer.start()
+    await worker_stats.start()
+    # Already run once in the gunicorn master (see gunicorn.conf.py)
+    if os.getenv('SKIP_STARTUP_TASKS', 'false').lower() == 'true':
+        return
     await seed_example_customers()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain buffered measurements so accepted points are not lost."""
+    await worker_stats.stop()
+    await measurement_buffer.stop()
+
 @app.get("/")
 async def root():
     try:
@@ -49,4 +70,7 @@ async def root():
         return {"error": str(e)}
 
 if __name__ == "__main__":
+    if os.getenv('APP_ENV', 'development').lower() == 'production':
+        # Multi-process serving mode, see gunicorn.conf.py
+        os.execvp("gunicorn", ["gunicorn", "-c", "gunicorn.conf.py", "main:app"])
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import gzip
+from typing import Callable, Dict, List, Optional, Tuple
+from database.cache import LocalCache
+
+# Optional encoders; an encoding is only offered when its package is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+
+
+def _gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def _brotli(body: bytes) -> bytes:
+    return brotli.compress(body, quality=5)
+
+
+def _zstd(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=6).compress(body)
+
+
+# Server preference order when the client accepts several encodings equally
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {}
+if brotli is not None:
+    ENCODERS['br'] = _brotli
+if zstandard is not None:
+    ENCODERS['zstd'] = _zstd
+ENCODERS['gzip'] = _gzip
+
+
+def negotiate_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """Pick the best available encoding from an Accept-Encoding header."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        if not part.strip():
+            continue
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _with_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Add ``Accept-Encoding`` to the response's Vary header."""
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == b'vary':
+            fields = [field.strip().lower() for field in value.split(b',')]
+            if b'accept-encoding' in fields or b'*' in fields:
+                return headers
+            return headers[:index] + [(name, value + b', Accept-Encoding')] + headers[index + 1:]
+    return headers + [(b'vary', b'Accept-Encoding')]
+
+
+def _weak_etag(etag: bytes) -> bytes:
+    return etag if etag.startswith(b'W/') else b'W/' + etag
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with br, zstd or gzip.
+
+    Only complete (non-streaming) 200 responses of a compressible type larger
+    than ``min_size`` are compressed. Responses carrying an ETag describe an
+    immutable version of a resource, so their compressed bodies are cached
+    and reused until the ETag changes. Whenever an encoding was negotiated
+    the ETag is weakened, as a compressed body's bytes differ from the
+    identity body's; 304s and bodies too small to compress get the same
+    weak ETag, so validators never differ for one representation.
+
+    Every response carries ``Vary: Accept-Encoding``, including uncompressed
+    ones and 304s, so shared caches never hand one client's encoding to
+    another.
+    """
+
+    def __init__(self, app, min_size: int = MIN_SIZE, cache_size: int = 256):
+        self.app = app
+        self.min_size = min_size
+        self.body_cache = LocalCache(
+            max_items=cache_size,
+            default_ttl=float(os.getenv('COMPRESSION_CACHE_TTL_SECONDS', '300'))
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope['headers'])
+        encoding = negotiate_encoding(headers.get(b'accept-encoding', b'').decode('latin-1'), list(ENCODERS))
+        if encoding is None:
+            async def send_with_vary(message):
+                if message['type'] == 'http.response.start':
+                    message = {**message, 'headers': _with_vary(list(message.get('headers', [])))}
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message['type'] == 'http.response.start':
+                response_headers = [
+                    (name, _weak_etag(value) if name.lower() == b'etag' else value)
+                    for name, value in message.get('headers', [])
+                ]
+                start_message = {**message, 'headers': _with_vary(response_headers)}
+                return
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            if message.get('more_body', False) or not self._should_compress(start_message, body):
+                # Streaming or not worth compressing: forward unchanged
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self._compress(scope, start_message, body, encoding)
+            response_headers = [
+                (name, value) for name, value in start_message['headers']
+                if name.lower() != b'content-length'
+            ]
+            response_headers += [
+                (b'content-encoding', encoding.encode()),
+                (b'content-length', str(len(compressed)).encode()),
+            ]
+            await send({**start_message, 'headers': response_headers})
+            await send({'type': 'http.response.body', 'body': compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, start_message, body: bytes) -> bool:
+        if start_message['status'] != 200 or len(body) < self.min_size:
+            return False
+        headers = dict((name.lower(), value) for name, value in start_message['headers'])
+        if b'content-encoding' in headers:
+            return False
+        content_type = headers.get(b'content-type', b'').decode('latin-1')
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _compress(self, scope, start_message, body: bytes, encoding: str) -> bytes:
+        etag = dict(start_message['headers']).get(b'etag')
+        if not etag:
+            return ENCODERS[encoding](body)
+
+        query = scope.get('query_string', b'').decode('latin-1')
+        key = f"{scope['path']}?{query}:{etag.decode('latin-1')}:{encoding}"
+        compressed = self.body_cache.get(key)
+        if not isinstance(compressed, bytes):
+            compressed = ENCODERS[encoding](body)
+            self.body_cache.set(key, compressed)
+        return compressed
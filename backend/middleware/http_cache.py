@@ -0,0 +1,86 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional
+from fastapi import Request, Response
+
+
+def _parse_updated_at(value: Optional[str]) -> Optional[datetime]:
+    """Parse the ISO-8601 ``updated_at`` stored on every model (naive UTC)."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    # HTTP dates only carry whole seconds
+    return parsed.replace(microsecond=0)
+
+
+def validators_for_items(items: Iterable[Dict[str, Any]], scope: str = "") -> Dict[str, str]:
+    """Build an ETag header from items' ``id``/``updated_at``.
+
+    Any create, update or delete changes the set of ``(id, updated_at)``
+    pairs and therefore the ETag. Lists get no Last-Modified: deleting an
+    item leaves the newest ``updated_at`` unchanged, so If-Modified-Since
+    would wrongly answer 304.
+    """
+    digest = hashlib.sha1(scope.encode())
+    count = 0
+    for item in items:
+        count += 1
+        digest.update(f"{item.get('id')}\x1f{item.get('updated_at')}\x1e".encode())
+    digest.update(str(count).encode())
+    return {"ETag": f'"{digest.hexdigest()}"'}
+
+
+def validators_for_item(item: Dict[str, Any], scope: str = "") -> Dict[str, str]:
+    """Build ETag and Last-Modified headers for a single item."""
+    headers = validators_for_items([item], scope)
+    updated_at = _parse_updated_at(item.get('updated_at'))
+    if updated_at is not None:
+        headers["Last-Modified"] = format_datetime(updated_at, usegmt=True)
+    return headers
+
+
+def validators_for_content(content: bytes) -> Dict[str, str]:
+    """Build an ETag for a response without ``updated_at`` (e.g. rendered plots)."""
+    return {"ETag": f'"{hashlib.sha1(content).hexdigest()}"'}
+
+
+def is_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against our validators."""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        # If-None-Match takes precedence; compare weakly as per RFC 9110
+        etag = headers["ETag"]
+        candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    headers: Dict[str, str]
+) -> Optional[Response]:
+    """Apply validators to ``response`` or return a 304 if the client is current.
+
+    Route handlers return the 304 response when one is given, otherwise they
+    carry on and return their payload as usual.
+    """
+    response.headers.update(headers)
+    response.headers["Cache-Control"] = "private, no-cache"
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=dict(response.headers))
+    return None
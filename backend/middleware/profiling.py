@@ -0,0 +1,374 @@
+"""On-demand request profiling.
+
+A request is profiled when an admin sends ``X-Profile: 1`` (authorized by
+``X-Profile-Token`` matching PROFILING_TOKEN, or a Cognito token in the
+PROFILING_ADMIN_GROUP group), or when its route has a sampling rate set via
+``PUT /admin/profiling/routes``. Code marks interesting sections with
+``span()``; a profiled request records a tree of timed spans and is exported
+as folded stacks (``root;child;leaf <microseconds>``), the input format of
+flamegraph.pl, speedscope and inferno.
+
+When no profile is active ``span()`` returns a shared no-op context manager
+after a single ContextVar lookup, so instrumented code pays effectively
+nothing. Sampling rates and stored profiles are shared by all workers on a
+host through PROFILING_OUTPUT_DIR: each worker picks up rate changes within
+a second, and any worker can serve any stored profile.
+"""
+import os
+import re
+import json
+import time
+import hmac
+import uuid
+import random
+import asyncio
+import tempfile
+from collections import deque, defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN')
+PROFILING_ADMIN_GROUP = os.getenv('PROFILING_ADMIN_GROUP', 'admin')
+PROFILING_OUTPUT_DIR = os.getenv('PROFILING_OUTPUT_DIR', os.path.join(tempfile.gettempdir(), 'profiles'))
+ROUTE_RATES_FILE = 'route_rates.json'
+
+_current_profile: ContextVar[Optional["Profile"]] = ContextVar('current_profile', default=None)
+
+
+class Profile:
+    """Timed spans recorded for one request."""
+
+    def __init__(self, name: str, reason: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.reason = reason
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = 0.0
+        self._stack: List[str] = [name]
+        self.records: List[Tuple[Tuple[str, ...], float]] = []
+        self._endpoint_start: Optional[float] = None
+        self._endpoint_end: Optional[float] = None
+        self._records_before_endpoint = 0
+
+    def push(self, name: str):
+        self._stack.append(name)
+
+    def pop(self, seconds: float):
+        self.records.append((tuple(self._stack), seconds))
+        self._stack.pop()
+
+    def mark_endpoint(self, start: float, end: float, records_before: int):
+        self._endpoint_start = start
+        self._endpoint_end = end
+        self._records_before_endpoint = records_before
+
+    def finish(self):
+        end = time.perf_counter()
+        self.duration = end - self._start
+        root = (self.name,)
+
+        # Time FastAPI spends outside the endpoint: parsing and validating the
+        # request before it, validating and serializing the response after
+        # it. Dependencies time themselves (auth.*, dependency.rate_limit,
+        # queue.dynamodb_slot), and spans recorded before the endpoint are
+        # subtracted so they are not counted twice.
+        endpoint_start = self._endpoint_start if self._endpoint_start is not None else end
+        before = sum(
+            seconds for stack, seconds in self.records[:self._records_before_endpoint]
+            if len(stack) == 2
+        )
+        self.records.append((root + ('fastapi.request_validation',), max(endpoint_start - self._start - before, 0.0)))
+        if self._endpoint_end is not None:
+            self.records.append((root + ('fastapi.response_serialization',), end - self._endpoint_end))
+        self.records.append((root, self.duration))
+
+    def folded(self) -> str:
+        """Self time per stack in microseconds, one ``a;b;c N`` line each."""
+        totals: Dict[Tuple[str, ...], float] = defaultdict(float)
+        children: Dict[Tuple[str, ...], float] = defaultdict(float)
+        for stack, seconds in self.records:
+            totals[stack] += seconds
+            if len(stack) > 1:
+                children[stack[:-1]] += seconds
+        lines = []
+        for stack, seconds in totals.items():
+            self_time = max(seconds - children[stack], 0.0)
+            lines.append(f"{';'.join(stack)} {int(self_time * 1_000_000)}")
+        return '\n'.join(sorted(lines)) + '\n'
+
+    def categories(self) -> Dict[str, float]:
+        """Total milliseconds per category (the span name before ``.``)."""
+        result: Dict[str, float] = defaultdict(float)
+        for stack, seconds in self.records:
+            if len(stack) < 2:
+                continue
+            category = stack[-1].split('.')[0]
+            # Spans nested in a span of the same category are already counted
+            if any(name.split('.')[0] == category for name in stack[1:-1]):
+                continue
+            result[category] += seconds * 1000
+        return dict(result)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "categories_ms": {k: round(v, 3) for k, v in self.categories().items()},
+        }
+
+
+class _Span:
+    __slots__ = ('profile', 'name', 'start')
+
+    def __init__(self, profile: Profile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.profile.push(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.pop(time.perf_counter() - self.start)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, detail: Optional[str] = None):
+    """Time a section of the current profiled request, e.g. ``span("dynamodb.scan", "customers")``.
+
+    ``detail`` is only formatted into the span name when profiling is active.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return _NOOP_SPAN
+    return _Span(profile, f"{name}:{detail}" if detail else name)
+
+
+_PROFILE_ID = re.compile(r'^[0-9a-f]{16}$')
+
+
+def _write_json(path: str, data: Any):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class Profiler:
+    """Profiling settings and recent profiles, shared through ``output_dir``.
+
+    Each worker keeps its last ``max_stored`` profiles in memory; the
+    directory keeps the newest ``max_stored`` profiles of all workers.
+    """
+
+    # Seconds between checks for sampling rates changed by another worker
+    RATES_REFRESH_INTERVAL = 1.0
+    # Stores between prunes of the shared directory
+    PRUNE_EVERY = 10
+
+    def __init__(self, max_stored: int = 100, output_dir: Optional[str] = PROFILING_OUTPUT_DIR):
+        self.output_dir = output_dir
+        self.max_stored = max_stored
+        self.route_rates: Dict[str, float] = {}
+        self.profiles: Deque[Profile] = deque(maxlen=max_stored)
+        self._stored = 0
+        self._rates_checked = 0.0
+        self._rates_mtime = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def set_route_rate(self, path: str, rate: float):
+        self.refresh_route_rates(force=True)
+        if rate > 0:
+            self.route_rates[path] = min(rate, 1.0)
+        else:
+            self.route_rates.pop(path, None)
+        if self.output_dir:
+            try:
+                os.makedirs(self.output_dir, exist_ok=True)
+                _write_json(self._path(ROUTE_RATES_FILE), self.route_rates)
+            except OSError as e:
+                print(f"Error writing profiling sampling rates: {str(e)}")
+
+    def clear_route_rates(self):
+        self.route_rates = {}
+        if self.output_dir:
+            try:
+                os.remove(self._path(ROUTE_RATES_FILE))
+            except OSError:
+                pass
+
+    def refresh_route_rates(self, force: bool = False):
+        """Reload sampling rates when another worker has changed them."""
+        now = time.monotonic()
+        if not self.output_dir or (not force and now - self._rates_checked < self.RATES_REFRESH_INTERVAL):
+            return
+        self._rates_checked = now
+        path = self._path(ROUTE_RATES_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            if mtime != self._rates_mtime:
+                with open(path) as f:
+                    self.route_rates = json.load(f)
+                self._rates_mtime = mtime
+        except FileNotFoundError:
+            self.route_rates, self._rates_mtime = {}, None
+        except (OSError, ValueError) as e:
+            print(f"Error reading profiling sampling rates: {str(e)}")
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Summaries of stored profiles from every worker, newest first."""
+        summaries = {profile.id: profile.summary() for profile in self.profiles}
+        if self.output_dir and os.path.isdir(self.output_dir):
+            for name in os.listdir(self.output_dir):
+                if not name.endswith('.profile.json') or name[:16] in summaries:
+                    continue
+                try:
+                    with open(self._path(name)) as f:
+                        summaries[name[:16]] = json.load(f)['summary']
+                except (OSError, ValueError, KeyError):
+                    continue
+        return sorted(summaries.values(), key=lambda summary: summary['started_at'], reverse=True)
+
+    def get_folded(self, profile_id: str) -> Optional[str]:
+        """Folded stacks of a profile recorded by any worker."""
+        for profile in self.profiles:
+            if profile.id == profile_id:
+                return profile.folded()
+        if not self.output_dir or not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(self._path(f"{profile_id}.profile.json")) as f:
+                return json.load(f)['folded']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def store(self, profile: Profile):
+        self.profiles.append(profile)
+        if not self.output_dir:
+            return
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            _write_json(
+                self._path(f"{profile.id}.profile.json"),
+                {"summary": profile.summary(), "folded": profile.folded()}
+            )
+        except OSError as e:
+            print(f"Error writing profile {profile.id}: {str(e)}")
+        self._stored += 1
+        if self._stored % self.PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self):
+        """Delete all but the newest ``max_stored`` profiles in the directory."""
+        try:
+            paths = [self._path(name) for name in os.listdir(self.output_dir) if name.endswith('.profile.json')]
+            if len(paths) <= self.max_stored:
+                return
+            by_age = sorted(paths, key=lambda path: os.stat(path).st_mtime)
+            for path in by_age[:len(paths) - self.max_stored]:
+                os.remove(path)
+        except OSError:
+            # Another worker pruned the same files first
+            pass
+
+
+# Create a singleton instance
+profiler = Profiler(max_stored=int(os.getenv('PROFILING_MAX_STORED', '100')))
+
+
+async def is_profiling_admin(request: Request) -> bool:
+    # Imported here because auth.cognito is itself instrumented with span()
+    from auth.cognito import get_verified_claims
+
+    token = request.headers.get('x-profile-token')
+    if PROFILING_TOKEN and token and hmac.compare_digest(token, PROFILING_TOKEN):
+        return True
+
+    scheme, _, bearer = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and bearer:
+        claims = await get_verified_claims(bearer)
+        if claims and PROFILING_ADMIN_GROUP in claims.get('cognito:groups', []):
+            return True
+    return False
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that can profile its requests; pass as ``route_class`` to a router."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        endpoint = self.dependant.call
+        if not asyncio.iscoroutinefunction(endpoint):
+            return
+
+        endpoint_span = f"endpoint.{endpoint.__name__}"
+
+        async def timed_endpoint(*args, **kwargs):
+            profile = _current_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            records_before = len(profile.records)
+            start = time.perf_counter()
+            try:
+                with _Span(profile, endpoint_span):
+                    return await endpoint(*args, **kwargs)
+            finally:
+                profile.mark_endpoint(start, time.perf_counter(), records_before)
+
+        # The request handler looks up dependant.call on every request
+        self.dependant.call = timed_endpoint
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        path = self.path
+
+        async def profiled_handler(request: Request) -> Response:
+            reason = None
+            profiler.refresh_route_rates()
+            if 'x-profile' in request.headers:
+                if await is_profiling_admin(request):
+                    reason = 'requested'
+            elif profiler.route_rates and random.random() < profiler.route_rates.get(path, 0.0):
+                reason = 'sampled'
+            if reason is None:
+                return await handler(request)
+
+            profile = Profile(f"{request.method} {path}", reason)
+            token = _current_profile.set(profile)
+            try:
+                response = await handler(request)
+            finally:
+                _current_profile.reset(token)
+                profile.finish()
+                profiler.store(profile)
+
+            response.headers['X-Profile-Id'] = profile.id
+            response.headers['Server-Timing'] = ', '.join(
+                [f"{name};dur={ms:.3f}" for name, ms in profile.categories().items()]
+                + [f"total;dur={profile.duration * 1000:.3f}"]
+            )
+            return response
+
+        return profiled_handler
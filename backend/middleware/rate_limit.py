@@ -0,0 +1,305 @@
+import os
+import math
+import time
+import uuid
+import random
+import asyncio
+import threading
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException, Request
+from auth.cognito import get_verified_claims
+from database.cache import redis_from_url
+from middleware.profiling import span
+
+
+class Budget:
+    """Token bucket parameters: sustained ``rate`` per second up to ``burst``."""
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+
+
+# Point reads/writes (GetItem, PutItem, Query) are cheap; scans read the
+# whole table and get a much smaller budget
+BUDGETS: Dict[str, Budget] = {
+    'point': Budget(
+        'point',
+        rate=float(os.getenv('RATE_LIMIT_POINT_PER_SECOND', '20')),
+        burst=float(os.getenv('RATE_LIMIT_POINT_BURST', '40'))
+    ),
+    'scan': Budget(
+        'scan',
+        rate=float(os.getenv('RATE_LIMIT_SCAN_PER_SECOND', '0.5')),
+        burst=float(os.getenv('RATE_LIMIT_SCAN_BURST', '3'))
+    ),
+}
+
+
+class InMemoryRateLimitStore:
+    """Per-process token buckets (default; each worker enforces its own budget)."""
+
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, budget: Budget, cost: float = 1.0) -> Tuple[bool, float]:
+        """Take ``cost`` tokens; returns (allowed, seconds until allowed)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (budget.burst, now))
+            tokens = min(budget.burst, tokens + (now - updated) * budget.rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                allowed, retry_after = True, 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, retry_after = False, (cost - tokens) / budget.rate
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now: float):
+        # Buckets idle long enough to have refilled carry no state worth keeping
+        max_idle = max(b.burst / b.rate for b in BUDGETS.values())
+        self._buckets = {
+            key: state for key, state in self._buckets.items()
+            if now - state[1] < max_idle
+        }
+
+
+class RedisRateLimitStore:
+    """Token buckets shared by all workers through Redis."""
+
+    # Refill and take atomically, using the server clock so workers agree
+    TAKE_SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    else
+        retry_after = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+    return {allowed, tostring(retry_after)}
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, namespace: str = 'rate-limit:'):
+        if client is None:
+            try:
+                client = redis_from_url(url)
+            except ImportError:
+                raise ImportError("The 'redis' package is required for the shared rate limit store")
+        self.client = client
+        self.namespace = namespace
+        self._take = self.client.register_script(self.TAKE_SCRIPT)
+
+    def take(self, key: str, budget: Budget, cost: float = 1.0) -> Tuple[bool, float]:
+        allowed, retry_after = self._take(
+            keys=[f"{self.namespace}{key}"],
+            args=[budget.rate, budget.burst, cost]
+        )
+        return bool(allowed), float(retry_after)
+
+
+def create_store_from_env():
+    """RATE_LIMIT_BACKEND: ``memory`` (default) or ``redis``."""
+    if os.getenv('RATE_LIMIT_BACKEND', 'memory').lower() == 'redis':
+        try:
+            url = os.getenv('RATE_LIMIT_REDIS_URL', os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+            print("Using shared Redis rate limit store")
+            return RedisRateLimitStore(url=url)
+        except Exception as e:
+            print(f"Error initializing shared rate limit store, falling back to in-process: {str(e)}")
+    return InMemoryRateLimitStore()
+
+
+rate_limit_store = create_store_from_env()
+
+
+async def get_principal(request: Request) -> str:
+    """Key requests by verified Cognito ``sub``, falling back to the client IP."""
+    authorization = request.headers.get('authorization', '')
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        claims = await get_verified_claims(token)
+        if claims and claims.get('sub'):
+            return f"sub:{claims['sub']}"
+    client_host = request.client.host if request.client else 'unknown'
+    return f"ip:{client_host}"
+
+
+def rate_limit(budget_name: str, cost: float = 1.0):
+    """Dependency enforcing a per-principal token bucket; raises 429 when empty."""
+    budget = BUDGETS[budget_name]
+
+    async def dependency(request: Request):
+        with span("dependency.rate_limit", budget.name):
+            principal = await get_principal(request)
+            try:
+                allowed, retry_after = rate_limit_store.take(f"{budget.name}:{principal}", budget, cost)
+            except Exception as e:
+                # Fail open: a broken shared store must not take the API down
+                print(f"Error checking rate limit: {str(e)}")
+                return
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded for {budget.name} requests",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+    return dependency
+
+
+class RedisConcurrencyStore:
+    """Concurrency slots shared by all workers through Redis.
+
+    Holders are members of a sorted set scored by when they took their
+    slot. Slots older than ``lease`` seconds are reclaimed, so a worker
+    that dies mid-request cannot leak them.
+    """
+
+    # Reclaim expired leases and take a slot atomically, on the server clock
+    ACQUIRE_SCRIPT = """
+    local lease = tonumber(ARGV[1])
+    local limit = tonumber(ARGV[2])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - lease)
+    if redis.call('ZCARD', KEYS[1]) >= limit then
+        return 0
+    end
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], math.ceil(lease * 1000))
+    return 1
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, key: str = 'concurrency:dynamodb', lease: float = 60.0):
+        if client is None:
+            try:
+                client = redis_from_url(url)
+            except ImportError:
+                raise ImportError("The 'redis' package is required for the shared concurrency limit")
+        self.client = client
+        self.key = key
+        self.lease = lease
+        self._acquire = self.client.register_script(self.ACQUIRE_SCRIPT)
+
+    def acquire(self, holder: str, limit: int) -> bool:
+        return bool(self._acquire(keys=[self.key], args=[self.lease, limit, holder]))
+
+    def release(self, holder: str) -> None:
+        self.client.zrem(self.key, holder)
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight DynamoDB-heavy requests.
+
+    Requests wait up to ``queue_timeout`` seconds for a slot before being
+    rejected with 429, so bursts queue briefly instead of piling onto
+    DynamoDB and getting throttled. With a shared ``store`` the cap holds
+    across all workers; otherwise (or while the store is unreachable) each
+    worker enforces it on its own.
+    """
+
+    # Seconds between attempts to take a shared slot
+    POLL_INTERVAL = 0.02
+
+    def __init__(self, max_concurrency: int, queue_timeout: float, store: Optional[RedisConcurrencyStore] = None):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.store = store
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _busy(self) -> HTTPException:
+        return HTTPException(
+            status_code=429,
+            detail="Server is busy, please retry",
+            headers={"Retry-After": str(max(1, math.ceil(self.queue_timeout)))}
+        )
+
+    async def _acquire_shared(self, holder: str) -> Optional[bool]:
+        """Poll the shared store for a slot; None when the store is unavailable."""
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            try:
+                if self.store.acquire(holder, self.max_concurrency):
+                    return True
+            except Exception as e:
+                print(f"Error taking shared concurrency slot: {str(e)}")
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # Jitter so waiting workers do not retry in lockstep
+            await asyncio.sleep(min(remaining, self.POLL_INTERVAL * (0.5 + random.random())))
+
+    async def __call__(self):
+        with span("queue.dynamodb_slot"):
+            holder = await self._acquire()
+        try:
+            yield
+        finally:
+            if holder is None:
+                self._semaphore.release()
+            else:
+                try:
+                    self.store.release(holder)
+                except Exception as e:
+                    # The lease expires on its own
+                    print(f"Error releasing shared concurrency slot: {str(e)}")
+
+    async def _acquire(self) -> Optional[str]:
+        """Wait for a slot; returns the shared holder id, or None for a local slot."""
+        if self.store is not None:
+            holder = uuid.uuid4().hex
+            acquired = await self._acquire_shared(holder)
+            if acquired is False:
+                raise self._busy()
+            if acquired:
+                return holder
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._busy()
+        return None
+
+
+def create_concurrency_store_from_env() -> Optional[RedisConcurrencyStore]:
+    """Share the DynamoDB concurrency cap when RATE_LIMIT_BACKEND is ``redis``."""
+    if os.getenv('RATE_LIMIT_BACKEND', 'memory').lower() != 'redis':
+        return None
+    try:
+        url = os.getenv('RATE_LIMIT_REDIS_URL', os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+        return RedisConcurrencyStore(
+            url=url,
+            lease=float(os.getenv('DYNAMODB_CONCURRENCY_LEASE_SECONDS', '60'))
+        )
+    except Exception as e:
+        print(f"Error initializing shared concurrency limit, limiting per worker: {str(e)}")
+        return None
+
+
+dynamodb_concurrency = ConcurrencyLimiter(
+    max_concurrency=int(os.getenv('DYNAMODB_MAX_CONCURRENCY', '32')),
+    queue_timeout=float(os.getenv('DYNAMODB_QUEUE_TIMEOUT_SECONDS', '2')),
+    store=create_concurrency_store_from_env()
+)
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+from typing import Any, Dict, List, Optional
+
+# Directory where each worker periodically publishes its stats so any worker
+# can report on all of its siblings
+STATS_DIR = os.getenv('WORKER_STATS_DIR', os.path.join(tempfile.gettempdir(), 'worker-stats'))
+HEARTBEAT_INTERVAL = float(os.getenv('WORKER_HEARTBEAT_SECONDS', '5'))
+STALE_AFTER = HEARTBEAT_INTERVAL * 6
+
+
+class WorkerStats:
+    """Request counters for the current worker process.
+
+    A background task publishes a heartbeat every ``HEARTBEAT_INTERVAL``
+    seconds, so idle workers keep reporting as healthy.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.reset()
+
+    def reset(self):
+        """Start fresh counters; called in each worker right after fork."""
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self.requests_handled = 0
+        self.requests_in_flight = 0
+        self.errors = 0
+        # Tasks do not survive fork()
+        self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pid": self.pid,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "requests_handled": self.requests_handled,
+            "requests_in_flight": self.requests_in_flight,
+            "errors": self.errors,
+            "max_requests": int(os.getenv('GUNICORN_MAX_REQUESTS', '0')) or None,
+            "rss_bytes": _rss_bytes(),
+            "heartbeat_at": time.time(),
+        }
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self.heartbeat()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    def heartbeat(self):
+        try:
+            os.makedirs(STATS_DIR, exist_ok=True)
+            path = os.path.join(STATS_DIR, f"{self.pid}.json")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing worker heartbeat: {str(e)}")
+
+
+def _rss_bytes() -> int:
+    """Resident set size of this process (Linux only, 0 elsewhere)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_all_workers() -> List[Dict[str, Any]]:
+    """Collect the latest heartbeat of every live worker.
+
+    Heartbeats left behind by processes that have exited (a restarted
+    server, or workers gunicorn did not reap) are removed.
+    """
+    workers = {worker_stats.pid: dict(worker_stats.snapshot(), healthy=True)}
+    if not os.path.isdir(STATS_DIR):
+        return list(workers.values())
+    for name in os.listdir(STATS_DIR):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(STATS_DIR, name)
+        try:
+            with open(path) as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if stats['pid'] in workers:
+            continue
+        if not _pid_alive(stats['pid']):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        stats['healthy'] = time.time() - stats['heartbeat_at'] < STALE_AFTER
+        workers[stats['pid']] = stats
+    return [workers[pid] for pid in sorted(workers)]
+
+
+class WorkerStatsMiddleware:
+    """ASGI middleware counting requests handled by this worker."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        worker_stats.requests_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            worker_stats.errors += 1
+            raise
+        finally:
+            worker_stats.requests_in_flight -= 1
+            worker_stats.requests_handled += 1
+
+
+# Create a singleton instance
+worker_stats = WorkerStats()
@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional, Union
+from datetime import datetime
 from auth.cognito import cognito_scheme
 from database.dynamodb import dynamodb_client, DynamoDBClient
-from database.models import Customer
+from database.models import Customer, CustomerWithRelated, Site, User
+from database.single_table import RELATED_TYPES
+from middleware.http_cache import conditional_response, validators_for_item, validators_for_items
+from middleware.profiling import ProfiledRoute, span
+from middleware.rate_limit import rate_limit, dynamodb_concurrency
 
 router = APIRouter(
     prefix="/customers",
     tags=["customers"],
+    route_class=ProfiledRoute,
     dependencies=[Depends(cognito_scheme)]
 )
 
-@router.post("", response_model=Customer)
+# Scans read the whole table, so they draw from a much smaller budget. Rate
+# limits are checked before waiting for a DynamoDB concurrency slot.
+point_rate_limit = [Depends(rate_limit("point")), Depends(dynamodb_concurrency)]
+scan_rate_limit = [Depends(rate_limit("scan")), Depends(dynamodb_concurrency)]
+
+@router.post("", response_model=Customer, dependencies=point_rate_limit)
 async def create_customer(customer: Customer):
     try:
         success = await dynamodb_client.put_item(DynamoDBClient.CUSTOMERS_TABLE, customer.to_item())
@@ -20,28 +31,65 @@ async def create_customer(customer: Customer):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("", response_model=List[Customer])
-async def get_customers():
+@router.get("", response_model=List[Customer], dependencies=scan_rate_limit)
+async def get_customers(request: Request, response: Response):
     try:
         # For now, we'll use a scan operation since we're getting all customers
         # In a production environment, you might want to implement pagination
         items = await dynamodb_client.scan_table(DynamoDBClient.CUSTOMERS_TABLE)
-        return [Customer.from_item(item) for item in items]
+        not_modified = conditional_response(request, response, validators_for_items(items, "customers"))
+        if not_modified:
+            return not_modified
+        with span("pydantic.validate", "Customer"):
+            return [Customer.from_item(item) for item in items]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{customer_id}", response_model=Customer)
-async def get_customer(customer_id: str):
+# Plain reads keep the Customer shape; related lists only appear when included
+@router.get("/{customer_id}", response_model=Union[CustomerWithRelated, Customer], dependencies=point_rate_limit)
+async def get_customer(
+    customer_id: str,
+    request: Request,
+    response: Response,
+    include: Optional[str] = Query(None, description="Comma-separated related records to embed: sites, users")
+):
+    related = sorted({name.strip() for name in include.split(",") if name.strip()}) if include else []
+    unknown = set(related) - set(RELATED_TYPES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+
     try:
-        item = await dynamodb_client.get_item(DynamoDBClient.CUSTOMERS_TABLE, {"id": customer_id})
-        if not item:
+        if related:
+            # One Query in the single-table layout, one call per table otherwise
+            result = await dynamodb_client.get_customer_with_related(customer_id, tuple(related))
+        else:
+            item = await dynamodb_client.get_item(DynamoDBClient.CUSTOMERS_TABLE, {"id": customer_id})
+            result = {"customer": item} if item else None
+        if not result:
             raise HTTPException(status_code=404, detail="Customer not found")
-        return Customer.from_item(item)
+
+        if related:
+            items = [result["customer"]] + [item for name in RELATED_TYPES for item in result.get(name, [])]
+            validators = validators_for_items(items, f"customer:{','.join(related)}")
+        else:
+            validators = validators_for_item(result["customer"], "customer")
+        not_modified = conditional_response(request, response, validators)
+        if not_modified:
+            return not_modified
+        if not related:
+            with span("pydantic.validate", "Customer"):
+                return Customer.from_item(result["customer"])
+        with span("pydantic.validate", "CustomerWithRelated"):
+            return CustomerWithRelated(
+                **result["customer"],
+                sites=[Site.from_item(item) for item in result["sites"]] if "sites" in result else None,
+                users=[User.from_item(item) for item in result["users"]] if "users" in result else None
+            )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/name/{name}", response_model=List[Customer])
-async def get_customer_by_name(name: str):
+@router.get("/name/{name}", response_model=List[Customer], dependencies=point_rate_limit)
+async def get_customer_by_name(name: str, request: Request, response: Response):
     try:
         items = await dynamodb_client.query_by_index(
             DynamoDBClient.CUSTOMERS_TABLE,
@@ -49,11 +97,15 @@ async def get_customer_by_name(name: str):
             "name = :name",
             {":name": name}
         )
-        return [Customer.from_item(item) for item in items]
+        not_modified = conditional_response(request, response, validators_for_items(items, f"customers:name:{name}"))
+        if not_modified:
+            return not_modified
+        with span("pydantic.validate", "Customer"):
+            return [Customer.from_item(item) for item in items]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.put("/{customer_id}", response_model=Customer)
+@router.put("/{customer_id}", response_model=Customer, dependencies=point_rate_limit)
 async def update_customer(customer_id: str, customer: Customer):
     try:
         # Ensure the customer exists
@@ -63,6 +115,7 @@ async def update_customer(customer_id: str, customer: Customer):
 
         # Update the customer
         customer.id = customer_id  # Ensure we don't change the ID
+        customer.updated_at = datetime.utcnow().isoformat()  # Invalidates ETags
         success = await dynamodb_client.put_item(DynamoDBClient.CUSTOMERS_TABLE, customer.to_item())
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update customer")
@@ -70,7 +123,7 @@ async def update_customer(customer_id: str, customer: Customer):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.delete("/{customer_id}")
+@router.delete("/{customer_id}", dependencies=point_rate_limit)
 async def delete_customer(customer_id: str):
     try:
         success = await dynamodb_client.delete_item(DynamoDBClient.CUSTOMERS_TABLE, {"id": customer_id})
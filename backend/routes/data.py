@@ -1,37 +1,66 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Literal, Optional
 from io import StringIO
 from datetime import datetime, timedelta
 import random
 from auth.cognito import cognito_scheme
+from database.ingestion import measurement_buffer
+from database.models import Measurement
+from database.series import get_series
+from middleware.profiling import ProfiledRoute, span
+from middleware.rate_limit import rate_limit, dynamodb_concurrency
 
 router = APIRouter(
     prefix="/data",
     tags=["data"],
+    route_class=ProfiledRoute,
     dependencies=[Depends(cognito_scheme)]  # Apply Cognito auth to all endpoints in this router
 )
 
+_point_rate_limit = rate_limit("point")
+_scan_rate_limit = rate_limit("scan")
+
+# Query parameters that make the chart route read a stored series
+SERIES_PARAMS = ("start", "end", "max_points")
+
+
+async def series_rate_limit(request: Request):
+    """Charge the scan budget only when the request queries a series partition."""
+    if any(name in request.query_params for name in SERIES_PARAMS):
+        await _scan_rate_limit(request)
+    else:
+        await _point_rate_limit(request)
+
 @router.post("/analyze")
 async def analyze_data(data: List[Dict[str, float]]):
     try:
         # Convert input data to pandas DataFrame
-        df = pd.DataFrame(data)
+        with span("pandas.dataframe"):
+            df = pd.DataFrame(data)
         
         # Perform some basic analysis
-        analysis = {
-            "mean": df.mean().to_dict(),
-            "median": df.median().to_dict(),
-            "std": df.std().to_dict(),
-            "summary": df.describe().to_dict()
-        }
+        with span("pandas.analyze"):
+            analysis = {
+                "mean": df.mean().to_dict(),
+                "median": df.median().to_dict(),
+                "std": df.std().to_dict(),
+                "summary": df.describe().to_dict()
+            }
         
         return analysis
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-@router.get("/sites/{site_id}/gts/{gt_id}")
-async def get_groundtruth_data(site_id: str, gt_id: str):
+@router.get("/sites/{site_id}/gts/{gt_id}", dependencies=[Depends(series_rate_limit), Depends(dynamodb_concurrency)])
+async def get_groundtruth_data(
+    site_id: str,
+    gt_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: Optional[int] = Query(None, ge=4, le=100_000, description="Downsample each series to at most this many points"),
+    mode: Literal["lttb", "minmax"] = "lttb"
+):
     try:
         # Mock data for a specific ground truth measurement
         mock_data = {
@@ -50,8 +79,11 @@ async def get_groundtruth_data(site_id: str, gt_id: str):
                 "sensor_type": "TEROS-12",
                 "calibration_date": (datetime.now() - timedelta(days=30)).isoformat(),
                 "accuracy": "±0.1°C"
-            }
+            },
         }
+        # Stored readings are only read when the client asks for a window or a resolution
+        if start is not None or end is not None or max_points:
+            mock_data["series"] = await get_series(f"{site_id}#{gt_id}", start, end, max_points, mode)
         return mock_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
@@ -78,6 +110,31 @@ async def get_site_groundtruths(site_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
 
+@router.post("/sites/{site_id}/gts/{gt_id}/measurements", status_code=202)
+async def ingest_measurements(site_id: str, gt_id: str, measurements: List[Measurement]):
+    """Accept readings into the write-behind buffer; they are written in batches."""
+    points = [measurement.to_item(site_id, gt_id) for measurement in measurements]
+    if len(points) > measurement_buffer.max_points:
+        # Retrying would never help; the client has to split the upload
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {measurement_buffer.max_points} measurements per request"
+        )
+    if not measurement_buffer.offer(points):
+        raise HTTPException(
+            status_code=429,
+            detail="Ingestion buffer is full, please retry",
+            headers={"Retry-After": str(max(1, int(measurement_buffer.flush_interval)))}
+        )
+    return {"accepted": len(points), "queue_depth": measurement_buffer.queue_depth}
+
+@router.get("/ingest/metrics")
+async def get_ingest_metrics():
+    try:
+        return measurement_buffer.metrics()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/sites")
 async def get_sites():
     try:
@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from middleware.worker_stats import worker_stats, read_all_workers
 
 router = APIRouter(
     prefix="/health",
@@ -8,6 +9,19 @@ router = APIRouter(
 @router.get("")
 async def health_check():
     try:
-        return {"status": "healthy"}
+        return {"status": "healthy", "worker": worker_stats.snapshot()}
+    except Exception as e:
+        return {"status": "unhealthy", "error": str(e)}
+
+@router.get("/workers")
+async def workers_health_check():
+    try:
+        workers = read_all_workers()
+        healthy = all(worker["healthy"] for worker in workers)
+        return {
+            "status": "healthy" if healthy else "degraded",
+            "worker_count": len(workers),
+            "workers": workers
+        }
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)} 
\ No newline at end of file
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from middleware.profiling import profiler, is_profiling_admin
+
+async def require_profiling_admin(request: Request):
+    if not await is_profiling_admin(request):
+        raise HTTPException(status_code=403, detail="Profiling requires admin authorization")
+
+router = APIRouter(
+    prefix="/admin/profiling",
+    tags=["admin"],
+    dependencies=[Depends(require_profiling_admin)]
+)
+
+class RouteSamplingRate(BaseModel):
+    path: str  # Route template, e.g. "/customers/{customer_id}"
+    rate: float = Field(ge=0.0, le=1.0)  # Fraction of requests to profile, 0 disables
+
+@router.get("")
+async def get_profiling_status():
+    try:
+        profiler.refresh_route_rates(force=True)
+        return {
+            "route_rates": profiler.route_rates,
+            "profiles": profiler.summaries()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/routes")
+async def set_route_sampling_rate(sampling: RouteSamplingRate):
+    try:
+        profiler.set_route_rate(sampling.path, sampling.rate)
+        return {"route_rates": profiler.route_rates}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """Folded stacks for flamegraph.pl, speedscope or inferno."""
+    folded = profiler.get_folded(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return folded
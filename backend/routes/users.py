@@ -1,19 +1,28 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from typing import List, Literal, Optional, Dict, Any
 from pydantic import BaseModel
 import plotly.graph_objects as go
 import plotly.utils
 import json
 from auth.cognito import cognito_scheme
+from database.cache import cache
+from database.downsampling import downsample_figure
 from database.dynamodb import dynamodb_client
 from database.models import User
+from middleware.http_cache import conditional_response, validators_for_content, validators_for_item, validators_for_items
+from middleware.profiling import ProfiledRoute, span
+from middleware.rate_limit import rate_limit, dynamodb_concurrency
 
 router = APIRouter(
     prefix="/users",
     tags=["users"],
+    route_class=ProfiledRoute,
     dependencies=[Depends(cognito_scheme)]  # Apply Cognito auth to all endpoints in this router
 )
 
+# Endpoints backed by DynamoDB point operations
+point_rate_limit = [Depends(rate_limit("point")), Depends(dynamodb_concurrency)]
+
 class UserBase(BaseModel):
     name: str
     email: str
@@ -64,34 +73,56 @@ def create_sample_plot() -> Dict[str, Any]:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating plot: {str(e)}")
 
+def render_users_payload(max_points: Optional[int] = None, mode: str = "lttb"):
+    """Render the /users payload along with its validators."""
+    plot = create_sample_plot()
+    if max_points:
+        plot = downsample_figure(plot, max_points, mode)
+    payload = {
+        "users": [
+            {"id": 1, "name": "John Doe", "email": "john@example.com", "is_active": True},
+            {"id": 2, "name": "Jane Doe", "email": "jane@example.com", "is_active": True}
+        ],
+        "plot": plot
+    }
+    return payload, validators_for_content(json.dumps(payload, sort_keys=True).encode())
+
 @router.get("", response_model=Dict[str, Any])
-async def get_users():
+async def get_users(
+    request: Request,
+    response: Response,
+    max_points: Optional[int] = Query(None, ge=4, le=100_000, description="Downsample each plot trace to at most this many points"),
+    mode: Literal["lttb", "minmax"] = "lttb"
+):
     try:
-        # Generate the plot data
-        plot_data = create_sample_plot()
-        
+        # Render the payload once per resolution and share it across workers
+        payload, headers = cache.get_or_set(
+            f"render:users:{max_points}:{mode}",
+            lambda: render_users_payload(max_points, mode)
+        )
+        not_modified = conditional_response(request, response, headers)
+        if not_modified:
+            return not_modified
+
         # Return both user data and plot data
-        return {
-            "users": [
-                {"id": 1, "name": "John Doe", "email": "john@example.com", "is_active": True},
-                {"id": 2, "name": "Jane Doe", "email": "jane@example.com", "is_active": True}
-            ],
-            "plot": plot_data
-        }
+        return payload
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{user_id}", response_model=User)
-async def get_user(user_id: int):
+@router.get("/{user_id}", response_model=User, dependencies=point_rate_limit)
+async def get_user(user_id: int, request: Request, response: Response):
     try:
         item = await dynamodb_client.get_item("users", {"id": str(user_id)})
         if not item:
             raise HTTPException(status_code=404, detail="User not found")
+        not_modified = conditional_response(request, response, validators_for_item(item, "user"))
+        if not_modified:
+            return not_modified
         return User.from_item(item)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/users", response_model=User)
+@router.post("/users", response_model=User, dependencies=point_rate_limit)
 async def create_user(user: User):
     try:
         success = await dynamodb_client.put_item("users", user.to_item())
@@ -101,8 +132,8 @@ async def create_user(user: User):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/users/email/{email}", response_model=List[User])
-async def get_user_by_email(email: str):
+@router.get("/users/email/{email}", response_model=List[User], dependencies=point_rate_limit)
+async def get_user_by_email(email: str, request: Request, response: Response):
     try:
         items = await dynamodb_client.query_by_index(
             "users",
@@ -110,11 +141,15 @@ async def get_user_by_email(email: str):
             "email = :email",
             {":email": email}
         )
-        return [User.from_item(item) for item in items]
+        not_modified = conditional_response(request, response, validators_for_items(items, f"users:email:{email}"))
+        if not_modified:
+            return not_modified
+        with span("pydantic.validate", "User"):
+            return [User.from_item(item) for item in items]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.put("/users/{user_id}", response_model=User)
+@router.put("/users/{user_id}", response_model=User, dependencies=point_rate_limit)
 async def update_user(user_id: str, user: User):
     try:
         # Ensure the user exists
@@ -131,7 +166,7 @@ async def update_user(user_id: str, user: User):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.delete("/users/{user_id}")
+@router.delete("/users/{user_id}", dependencies=point_rate_limit)
 async def delete_user(user_id: str):
     try:
         success = await dynamodb_client.delete_item("users", {"id": user_id})
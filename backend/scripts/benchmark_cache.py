@@ -0,0 +1,130 @@
+"""Compare single-tier and two-tier caching across several workers.
+
+Simulates N workers (default 4) behind a round-robin load balancer serving
+a skewed read/write workload against one table. Each worker has its own
+local tier; in two-tier mode they also share a Redis tier and apply each
+other's invalidations. Reports hit rates and DynamoDB read units consumed.
+
+Usage (from backend/):
+    python -m scripts.benchmark_cache [--workers 4] [--requests 20000]
+
+Uses CACHE_REDIS_URL when set, otherwise an in-memory ``fakeredis`` server.
+"""
+import argparse
+import os
+import random
+import time
+from database.cache import LocalCache, RedisCache, TieredCache
+
+# Eventually consistent GetItem of an item under 4KB
+READ_UNITS_PER_GET = 0.5
+
+
+class CountingTable:
+    """Stand-in for a DynamoDB table that counts billed reads."""
+
+    def __init__(self, size: int):
+        self.items = {str(i): {"id": str(i), "name": f"customer-{i}", "version": 0} for i in range(size)}
+        self.read_units = 0.0
+
+    def get_item(self, key: str):
+        self.read_units += READ_UNITS_PER_GET
+        return dict(self.items[key])
+
+    def put_item(self, key: str):
+        self.items[key]["version"] += 1
+
+
+def create_shared_tier(flush: bool = True) -> RedisCache:
+    url = os.getenv('CACHE_REDIS_URL')
+    if url:
+        shared = RedisCache(url=url, namespace="benchmark-cache:")
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            raise SystemExit("Set CACHE_REDIS_URL or install 'fakeredis' to run the two-tier benchmark")
+        shared = RedisCache(client=fakeredis.FakeRedis(server=_FAKE_SERVER), namespace="benchmark-cache:")
+    if flush:
+        shared.clear()
+    return shared
+
+
+_FAKE_SERVER = None
+
+
+def run(mode: str, workers: int, requests: int, keys: int, write_ratio: float, ttl: float, seed: int):
+    rng = random.Random(seed)
+    table = CountingTable(keys)
+    caches = []
+    for i in range(workers):
+        local = LocalCache(max_items=max(keys // 4, 1), default_ttl=ttl)
+        shared = create_shared_tier(flush=i == 0) if mode == "two-tier" else None
+        caches.append(TieredCache(local, shared))
+
+    # Zipf-like popularity so a small set of customers receives most reads
+    weights = [1.0 / (rank + 1) for rank in range(keys)]
+    population = list(table.items.keys())
+
+    started = time.perf_counter()
+    for n in range(requests):
+        worker = caches[n % workers]
+        key = rng.choices(population, weights)[0]
+        cache_key = f"ddb:customers:item:{key}"
+        if rng.random() < write_ratio:
+            table.put_item(key)
+            worker.invalidate(keys=[cache_key])
+        else:
+            worker.get_or_set(cache_key, lambda: table.get_item(key))
+    elapsed = time.perf_counter() - started
+
+    local_hits = sum(c.local.hits for c in caches)
+    local_lookups = local_hits + sum(c.local.misses for c in caches)
+    shared_hits = sum(c.shared.hits for c in caches if c.shared)
+    reads = table.read_units / READ_UNITS_PER_GET
+    for c in caches:
+        if c.shared:
+            c.shared.close()
+
+    return {
+        "mode": mode,
+        "local_hit_rate": local_hits / local_lookups if local_lookups else 0.0,
+        "overall_hit_rate": 1 - reads / local_lookups if local_lookups else 0.0,
+        "shared_hits": shared_hits,
+        "dynamodb_reads": int(reads),
+        "read_units": table.read_units,
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    global _FAKE_SERVER
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--keys", type=int, default=2000)
+    parser.add_argument("--write-ratio", type=float, default=0.02)
+    parser.add_argument("--ttl", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not os.getenv('CACHE_REDIS_URL'):
+        try:
+            import fakeredis
+            _FAKE_SERVER = fakeredis.FakeServer()
+        except ImportError:
+            pass
+
+    print(f"{args.workers} workers, {args.requests} requests, {args.keys} keys, {args.write_ratio:.0%} writes")
+    print(f"{'mode':<12}{'local hit':>11}{'overall hit':>13}{'shared hits':>13}{'ddb reads':>11}{'RCUs':>10}{'sec':>8}")
+    for mode in ("single-tier", "two-tier"):
+        result = run(mode, args.workers, args.requests, args.keys, args.write_ratio, args.ttl, args.seed)
+        print(
+            f"{result['mode']:<12}{result['local_hit_rate']:>11.1%}{result['overall_hit_rate']:>13.1%}"
+            f"{result['shared_hits']:>13}{result['dynamodb_reads']:>11}{result['read_units']:>10.1f}"
+            f"{result['elapsed']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
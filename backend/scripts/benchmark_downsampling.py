@@ -0,0 +1,104 @@
+"""Measure chart downsampling cost and payload savings.
+
+Builds a synthetic sensor series (the same generator as
+``scripts.synthetic_data``), then reports for each mode and resolution the
+time to pick the points, the JSON payload size against shipping every
+point, and how far the kept points stray from the full line. The
+vectorized LTTB is checked against a straightforward pure-Python version.
+
+Usage (from backend/):
+    python -m scripts.benchmark_downsampling [--points 1000000] [--max-points 500 2000 5000]
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+import numpy as np
+from database.downsampling import lttb_indices, downsample_indices, MODES
+from scripts.synthetic_data import generate_series
+
+
+def reference_lttb(x, y, threshold):
+    """Textbook LTTB, one point at a time."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x = sum(x[next_lo:next_hi]) / (next_hi - next_lo)
+            avg_y = sum(y[next_lo:next_hi]) / (next_hi - next_lo)
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def payload_bytes(timestamps, values) -> int:
+    return len(json.dumps({"timestamps": timestamps, "values": values}).encode())
+
+
+def max_error(x, y, keep) -> float:
+    """Largest vertical gap between the full series and the line through the kept points."""
+    return float(np.max(np.abs(y - np.interp(x, x[keep], y[keep]))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--max-points', type=int, nargs='+', default=[500, 2000, 5000])
+    parser.add_argument('--interval', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    items = generate_series(rng, 'site_0', 'gt_0', datetime(2024, 1, 1), 0, args.points, args.interval)
+    timestamps = [item['timestamp'] for item in items]
+    y = np.array([float(item['values']['temperature']) for item in items])
+    x = np.arange(args.points, dtype=np.float64) * args.interval
+
+    # Correctness against the reference on a slice small enough for pure Python
+    sample = min(args.points, 100_000)
+    for threshold in (3, 100, 1000):
+        expected = reference_lttb(x[:sample].tolist(), y[:sample].tolist(), threshold)
+        assert lttb_indices(x[:sample], y[:sample], threshold).tolist() == expected, threshold
+    start = time.perf_counter()
+    reference_lttb(x[:sample].tolist(), y[:sample].tolist(), 1000)
+    reference_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    lttb_indices(x[:sample], y[:sample], 1000)
+    vectorized_ms = (time.perf_counter() - start) * 1000
+    print(f"LTTB matches reference; {sample:,} -> 1,000 points: pure Python {reference_ms:.1f} ms, NumPy {vectorized_ms:.1f} ms")
+
+    full = payload_bytes(timestamps, y.tolist())
+    print(f"\nFull series: {args.points:,} points, {full / 1e6:.1f} MB JSON")
+    print(f"{'mode':<8}{'max points':>11}{'kept':>8}{'ms':>9}{'bytes':>12}{'of full':>9}{'max err':>9}")
+    for mode in MODES:
+        for max_points in args.max_points:
+            # Best of three, so one-off warm-up costs do not skew small runs
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                keep = downsample_indices(x, y, max_points, mode)
+                timings.append((time.perf_counter() - start) * 1000)
+            elapsed = min(timings)
+            size = payload_bytes([timestamps[i] for i in keep], y[keep].tolist())
+            print(
+                f"{mode:<8}{max_points:>11,}{len(keep):>8,}{elapsed:>9.1f}{size:>12,}"
+                f"{size / full:>9.2%}{max_error(x, y, keep):>9.3f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Overhead of the profiling hooks when profiling is disabled.
+
+Measures (1) the cost of an instrumented ``span()`` block against the bare
+code and (2) the per-request cost of ``ProfiledRoute`` against a plain
+``APIRoute`` by driving small FastAPI apps directly through ASGI (no
+network, no DynamoDB), plus the cost when every request is profiled.
+
+Per-request differences are a few percent, well inside run-to-run noise,
+so the configurations are run in interleaved rounds (rotating which goes
+first) and reported as min and median over the rounds. Profiles are
+written to a temporary directory.
+
+Usage (from backend/):
+    python -m scripts.benchmark_profiling [--requests 5000] [--rounds 9]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+import timeit
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+from middleware.profiling import ProfiledRoute, profiler, span
+
+
+def build_app(route_class) -> FastAPI:
+    router = APIRouter(route_class=route_class)
+
+    @router.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        with span("dynamodb.get_item", "items"):
+            item = {"id": item_id, "name": "example", "updated_at": "2024-01-01T00:00:00"}
+        with span("pydantic.validate", "Item"):
+            return item
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+async def drive(app: FastAPI, requests: int) -> float:
+    """Return mean microseconds per request through the ASGI interface."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/items/42", "raw_path": b"/items/42", "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    # Warm up
+    for _ in range(min(requests, 200)):
+        await app(scope, receive, send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def span_overhead(iterations: int):
+    def bare():
+        x = 1 + 1
+        return x
+
+    def instrumented():
+        with span("dynamodb.get_item", "customers"):
+            x = 1 + 1
+        return x
+
+    bare_ns = min(timeit.repeat(bare, number=iterations, repeat=5)) / iterations * 1e9
+    span_ns = min(timeit.repeat(instrumented, number=iterations, repeat=5)) / iterations * 1e9
+    return bare_ns, span_ns
+
+
+async def run_rounds(requests: int, rounds: int):
+    """Microseconds per request of each configuration, one sample per round."""
+    configs = {
+        "APIRoute": (build_app(APIRoute), 0.0),
+        "ProfiledRoute (disabled)": (build_app(ProfiledRoute), 0.0),
+        "ProfiledRoute (100% sampled)": (build_app(ProfiledRoute), 1.0),
+    }
+    names = list(configs)
+    samples = {name: [] for name in names}
+    for round_number in range(rounds):
+        # Rotate the order so no configuration always runs first (or last)
+        shift = round_number % len(names)
+        for name in names[shift:] + names[:shift]:
+            app, rate = configs[name]
+            profiler.set_route_rate("/items/{item_id}", rate)
+            samples[name].append(await drive(app, requests))
+    profiler.set_route_rate("/items/{item_id}", 0.0)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per configuration per round")
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    bare_ns, span_ns = span_overhead(args.iterations)
+    print(f"span() disabled: {span_ns - bare_ns:.0f} ns per block ({bare_ns:.0f} ns bare, {span_ns:.0f} ns instrumented)")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        profiler.output_dir = output_dir
+        samples = asyncio.run(run_rounds(args.requests, args.rounds))
+
+    base_min = min(samples["APIRoute"])
+    base_median = statistics.median(samples["APIRoute"])
+    print(f"\n{args.rounds} interleaved rounds of {args.requests:,} requests per configuration")
+    print(f"{'route':<30}{'min us':>9}{'median us':>11}{'min ovh':>10}{'median ovh':>12}")
+    for name, values in samples.items():
+        low, median = min(values), statistics.median(values)
+        overheads = "" if name == "APIRoute" else f"{(low - base_min) / base_min:>10.1%}{(median - base_median) / base_median:>12.1%}"
+        print(f"{name:<30}{low:>9.1f}{median:>11.1f}{overheads}")
+
+
+if __name__ == "__main__":
+    main()
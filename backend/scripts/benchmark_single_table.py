@@ -0,0 +1,152 @@
+"""Compare fetching a customer with its sites and users in both table layouts.
+
+Creates the per-entity tables and the single table on a local DynamoDB
+stand-in, loads a synthetic dataset, copies it into the single table with
+the migration tool, then times ``get_customer_with_related`` for the same
+customers in the multi-table layout (GetItem plus one query per related
+table) and the single-table layout (one Query). Caching is disabled so
+every request reaches DynamoDB; ``--rtt-ms`` adds a simulated network
+round-trip to each call, as local stand-ins answer much faster than AWS.
+
+Usage (from backend/):
+    python -m scripts.benchmark_single_table [--customers 500] [--requests 300] [--rtt-ms 5]
+
+Uses AWS_ENDPOINT_URL_DYNAMODB when set (e.g. DynamoDB Local), otherwise an
+in-process moto server. moto's Query cost grows with the table rather than
+the result, so its latencies say little about DynamoDB: compare the
+round-trip counts, and use ``--rtt-ms`` to see what they cost over a network.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import time
+
+TABLES = {
+    'DYNAMODB_USERS_TABLE': 'bench-users',
+    'DYNAMODB_SITES_TABLE': 'bench-sites',
+    'DYNAMODB_CUSTOMERS_TABLE': 'bench-customers',
+    'DYNAMODB_MEASUREMENTS_TABLE': 'bench-measurements',
+    'DYNAMODB_SINGLE_TABLE': 'bench-single',
+}
+
+
+def start_dynamodb_stand_in():
+    if os.getenv('AWS_ENDPOINT_URL_DYNAMODB'):
+        return None
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise SystemExit("Set AWS_ENDPOINT_URL_DYNAMODB or install 'moto[server]'")
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    os.environ['AWS_ENDPOINT_URL_DYNAMODB'] = f"http://{host}:{port}"
+    return server
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+async def run(args):
+    import numpy as np
+    from scripts.synthetic_data import create_tables, generate_customers, generate_sites, generate_users
+
+    # The client reads its configuration and checks the tables at import
+    create_tables(None)
+    from database.dynamodb import dynamodb_client, DynamoDBClient
+    from scripts.migrate_single_table import copy_table
+
+    rng = np.random.default_rng(args.seed)
+    customers = generate_customers(rng, args.customers)
+    owners = [customer['id'] for customer in customers]
+    datasets = {
+        DynamoDBClient.CUSTOMERS_TABLE: customers,
+        DynamoDBClient.SITES_TABLE: generate_sites(rng, args.customers * args.sites_per_customer, owners),
+        DynamoDBClient.USERS_TABLE: generate_users(rng, args.customers * args.users_per_customer, owners),
+    }
+    for table_name, items in datasets.items():
+        await dynamodb_client.batch_write_items(table_name, items)
+    for table_name in datasets:
+        await copy_table(table_name, segments=4, concurrency=4)
+    print(
+        f"Loaded {args.customers:,} customers with ~{args.sites_per_customer} sites and "
+        f"~{args.users_per_customer} users each"
+    )
+
+    # Count (and optionally delay) every request sent to DynamoDB
+    calls = {'count': 0}
+
+    def on_send(**kwargs):
+        calls['count'] += 1
+        if args.rtt_ms:
+            time.sleep(args.rtt_ms / 1000)
+
+    dynamodb_client.dynamodb.meta.client.meta.events.register('before-send.dynamodb', on_send)
+
+    sample = random.Random(args.seed).choices(owners, k=args.requests)
+    include = ('sites', 'users')
+    results = {}
+    print(f"\n{'layout':<8}{'calls/req':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean ms':>9}{'items/req':>11}")
+    for layout in ('multi', 'single'):
+        dynamodb_client.table_layout = layout
+        latencies, items = [], 0
+        calls['count'] = 0
+        for customer_id in sample:
+            start = time.perf_counter()
+            result = await dynamodb_client.get_customer_with_related(customer_id, include)
+            latencies.append((time.perf_counter() - start) * 1000)
+            items += 1 + sum(len(result[name]) for name in include)
+        results[layout] = {
+            'calls': calls['count'] / len(sample),
+            'latencies': latencies,
+        }
+        print(
+            f"{layout:<8}{calls['count'] / len(sample):>10.1f}{percentile(latencies, 0.5):>9.2f}"
+            f"{percentile(latencies, 0.95):>9.2f}{percentile(latencies, 0.99):>9.2f}"
+            f"{statistics.mean(latencies):>9.2f}{items / len(sample):>11.1f}"
+        )
+
+    # Both layouts must return the same records
+    for customer_id in sample[:20]:
+        by_layout = {}
+        for layout in ('multi', 'single'):
+            dynamodb_client.table_layout = layout
+            result = await dynamodb_client.get_customer_with_related(customer_id, include)
+            by_layout[layout] = {name: sorted(item['id'] for item in result[name]) for name in include}
+        assert by_layout['multi'] == by_layout['single'], customer_id
+
+    speedup = statistics.mean(results['multi']['latencies']) / statistics.mean(results['single']['latencies'])
+    print(f"\nSingle table: {results['multi']['calls'] / results['single']['calls']:.1f}x fewer round-trips, {speedup:.1f}x lower mean latency")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=500)
+    parser.add_argument('--sites-per-customer', type=int, default=5)
+    parser.add_argument('--users-per-customer', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--rtt-ms', type=float, default=0, help='Simulated network round-trip per DynamoDB call')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.update(TABLES, CACHE_BACKEND='none')
+    os.environ.setdefault('AWS_REGION', 'us-east-1')
+    os.environ.setdefault('AWS_DEFAULT_REGION', os.environ['AWS_REGION'])
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+    server = start_dynamodb_stand_in()
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
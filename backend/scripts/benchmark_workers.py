@@ -0,0 +1,134 @@
+"""Throughput of the gunicorn serving mode from 1 to N worker processes.
+
+For each worker count this starts ``gunicorn -c gunicorn.conf.py`` serving
+this module's ``app`` (the real app with Cognito auth bypassed), drives the
+CPU-bound ``POST /data/analyze`` endpoint from several client processes and
+reports requests per second and the speed-up over a single worker.
+
+Usage (from backend/, with DynamoDB reachable, e.g. DynamoDB Local via
+AWS_ENDPOINT_URL_DYNAMODB):
+    python -m scripts.benchmark_workers [--max-workers 4] [--duration 10]
+
+The load generator runs on the same machine, so leave it some cores: the
+numbers are most meaningful up to about half the available cores.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+BENCHMARK_PORT = 8765
+
+
+def _load_app():
+    from auth.cognito import cognito_scheme
+    from main import app
+
+    app.dependency_overrides[cognito_scheme] = lambda: None
+    return app
+
+
+def build_payload(rows: int, seed: int = 7) -> bytes:
+    rng = random.Random(seed)
+    data = [
+        {column: rng.uniform(0, 100) for column in ("temperature", "moisture", "conductivity", "depth")}
+        for _ in range(rows)
+    ]
+    return json.dumps(data).encode()
+
+
+def client_loop(port: int, payload: bytes, deadline: float, results):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/json", "Authorization": "Bearer benchmark"}
+    completed = errors = 0
+    while time.time() < deadline:
+        try:
+            conn.request("POST", "/data/analyze", body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                completed += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    results.put((completed, errors))
+
+
+def wait_until_ready(port: int, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health/workers")
+            body = json.loads(conn.getresponse().read())
+            conn.close()
+            return body
+        except (OSError, ValueError, http.client.HTTPException):
+            time.sleep(0.5)
+    raise RuntimeError("gunicorn did not become ready in time")
+
+
+def measure(workers: int, clients: int, duration: float, payload: bytes):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(BENCHMARK_PORT), APP_ENV='production')
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "scripts.benchmark_workers:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(BENCHMARK_PORT)
+        results = multiprocessing.Queue()
+        deadline = time.time() + duration
+        procs = [
+            multiprocessing.Process(target=client_loop, args=(BENCHMARK_PORT, payload, deadline, results))
+            for _ in range(clients)
+        ]
+        for proc in procs:
+            proc.start()
+        totals = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        completed = sum(t[0] for t in totals)
+        errors = sum(t[1] for t in totals)
+        return completed / duration, errors
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients-per-worker", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = build_payload(args.rows)
+    counts = sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i < args.max_workers], args.max_workers})
+
+    print(f"POST /data/analyze with {args.rows} rows, {args.duration:.0f}s per run")
+    print(f"{'workers':>8}{'clients':>9}{'req/s':>10}{'speed-up':>10}{'errors':>8}")
+    baseline = None
+    for workers in counts:
+        clients = workers * args.clients_per_worker
+        throughput, errors = measure(workers, clients, args.duration, payload)
+        baseline = baseline or throughput
+        speed_up = throughput / baseline if baseline else 0.0
+        print(f"{workers:>8}{clients:>9}{throughput:>10.1f}{speed_up:>9.2f}x{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
+else:
+    app = _load_app()
@@ -0,0 +1,80 @@
+"""Copy the customers, sites and users tables into the single table.
+
+Each source table is read with a parallel Scan (``--segments`` segments,
+each in its own thread), and every page is converted to the single-table
+key scheme and written with concurrent BatchWriteItem calls as soon as it
+arrives. Re-running is safe: items are overwritten with the same keys.
+
+The backend mirrors customer, site and user writes into the single table
+as soon as DYNAMODB_SINGLE_TABLE is set, so run this once after setting
+it and before switching reads over with DYNAMODB_TABLE_LAYOUT=single.
+
+Usage (from backend/):
+    python -m scripts.migrate_single_table [--segments 8] [--concurrency 4]
+
+Create the table first with ``python -m scripts.synthetic_data create-tables``
+(locally) or the CDK stack.
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+from database.dynamodb import dynamodb_client, DynamoDBClient
+from database.single_table import ENTITY_TYPES, to_single_table_item
+
+
+async def copy_table(table_name: str, segments: int, concurrency: int) -> Tuple[int, int]:
+    """Copy one table; returns (items read, items that could not be written)."""
+    source = dynamodb_client.get_table(table_name)
+    totals = {'read': 0, 'failed': 0}
+
+    async def copy_segment(segment: int):
+        params = {'Segment': segment, 'TotalSegments': segments}
+        while True:
+            page = await asyncio.to_thread(source.scan, **params)
+            items = [to_single_table_item(table_name, item) for item in page.get('Items', [])]
+            if items:
+                unwritten = await dynamodb_client.batch_write_items(
+                    DynamoDBClient.SINGLE_TABLE, items, key_names=('PK', 'SK'), max_concurrency=concurrency
+                )
+                totals['read'] += len(items)
+                totals['failed'] += len(unwritten)
+            if 'LastEvaluatedKey' not in page:
+                return
+            params['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+    await asyncio.gather(*(copy_segment(segment) for segment in range(segments)))
+    return totals['read'], totals['failed']
+
+
+async def migrate(args):
+    if not dynamodb_client.single_table_enabled:
+        raise SystemExit("DYNAMODB_SINGLE_TABLE is not set")
+    # Scan threads plus the batch writes each segment runs in parallel
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=args.segments * (args.concurrency + 1))
+    )
+
+    print(f"Copying into {dynamodb_client.get_actual_table_name(DynamoDBClient.SINGLE_TABLE)}")
+    failed_total = 0
+    for table_name in ENTITY_TYPES:
+        start = time.perf_counter()
+        read, failed = await copy_table(table_name, args.segments, args.concurrency)
+        elapsed = time.perf_counter() - start
+        failed_total += failed
+        print(f"{table_name:<11}{read:>12,} items {elapsed:>8.1f}s {read / max(elapsed, 1e-9):>10,.0f} items/s {failed:>8,} failed")
+    if failed_total:
+        raise SystemExit(f"{failed_total} items could not be written; re-run to retry them")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, default=8, help='Parallel scan segments per table')
+    parser.add_argument('--concurrency', type=int, default=4, help='Parallel BatchWriteItem calls per segment')
+    args = parser.parse_args()
+    asyncio.run(migrate(args))
+
+
+if __name__ == '__main__':
+    main()
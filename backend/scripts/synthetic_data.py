@@ -0,0 +1,390 @@
+"""Synthetic dataset generator and request trace replayer for capacity planning.
+
+Generate a seeded, production-sized dataset into DynamoDB (point
+AWS_ENDPOINT_URL_DYNAMODB at DynamoDB Local or another stand-in):
+
+    python -m scripts.synthetic_data create-tables
+    python -m scripts.synthetic_data generate --customers 1000000 --users 50000 \\
+        --sites 200 --series 100 --days 365 --interval 300 --seed 7
+
+Replay a recorded trace against a running API:
+
+    python -m scripts.synthetic_data replay trace.jsonl --base-url http://localhost:8000 \\
+        --token $TOKEN --speed 2 --concurrency 32
+
+Traces are JSON lines (``{"ts": 12.5, "method": "GET", "path": "/customers",
+"body": ...}``, ``ts`` in seconds from the start). Access logs cannot be
+replayed directly: the uvicorn workers log requests without a time field,
+so convert a load balancer or API gateway log to this format first.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Table layouts, mirroring cdk/lib/constructs/dynamodb.ts; index keys are (hash, range)
+TABLE_SCHEMAS = {
+    'DYNAMODB_USERS_TABLE': {
+        'keys': [('id', 'HASH')],
+        'indexes': {'email-index': ('email',), 'customer-index': ('customer_id',)},
+    },
+    'DYNAMODB_SITES_TABLE': {
+        'keys': [('id', 'HASH')],
+        'indexes': {'name-index': ('name',), 'customer-index': ('customer_id',)},
+    },
+    'DYNAMODB_CUSTOMERS_TABLE': {'keys': [('id', 'HASH')], 'indexes': {'name-index': ('name',)}},
+    'DYNAMODB_MEASUREMENTS_TABLE': {'keys': [('series_id', 'HASH'), ('timestamp', 'RANGE')], 'indexes': {}},
+    'DYNAMODB_SINGLE_TABLE': {'keys': [('PK', 'HASH'), ('SK', 'RANGE')], 'indexes': {'inverted-index': ('SK', 'PK')}},
+}
+# Created only when their environment variable is set
+OPTIONAL_TABLES = {'DYNAMODB_SINGLE_TABLE'}
+
+COMPANY_PREFIXES = np.array([
+    'Acme', 'Stark', 'Wayne', 'Umbrella', 'Cyberdyne', 'Oscorp', 'Weyland', 'Tyrell', 'Initech',
+    'Globex', 'Soylent', 'Hooli', 'Vandelay', 'Massive', 'Aperture', 'Black Mesa', 'Nakatomi', 'Gringotts',
+])
+COMPANY_SUFFIXES = np.array(['Corporation', 'Industries', 'Systems', 'Labs', 'Holdings', 'Group', 'Agritech', 'Partners'])
+FIRST_NAMES = np.array(['ana', 'ben', 'chen', 'dara', 'eli', 'fatima', 'gus', 'hana', 'ivan', 'jo', 'kai', 'lena', 'mo', 'nia'])
+LAST_NAMES = np.array(['smith', 'garcia', 'kim', 'okafor', 'novak', 'silva', 'patel', 'muller', 'rossi', 'tanaka'])
+EMAIL_DOMAINS = np.array(['gmail.com', 'example.com', 'farm.io', 'agro.net'])
+SOIL_TYPES = np.array(['Sandy Loam', 'Clay', 'Silt Loam', 'Loamy Sand'])
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _uuids(rng: np.random.Generator, n: int) -> List[str]:
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    return [str(uuid.UUID(bytes=row.tobytes(), version=4)) for row in raw]
+
+
+def _ages(rng: np.random.Generator, n: int, max_age_days: int) -> np.ndarray:
+    return rng.integers(0, max_age_days * 86400, size=n)
+
+
+def _iso(ages: np.ndarray) -> np.ndarray:
+    """ISO timestamps ``ages`` seconds before NOW (naive UTC, like the models)."""
+    base = np.datetime64(NOW.replace(tzinfo=None), 's')
+    return np.datetime_as_string(base - ages.astype('timedelta64[s]'), unit='us')
+
+
+def generate_customers(rng: np.random.Generator, n: int) -> List[Dict[str, Any]]:
+    names = np.char.add(np.char.add(rng.choice(COMPANY_PREFIXES, n), ' '), rng.choice(COMPANY_SUFFIXES, n))
+    numbers = rng.integers(1, 10_000, size=n).astype(str)
+    names = np.char.add(np.char.add(names, ' '), numbers)
+    created_age = _ages(rng, n, 3 * 365)
+    created, updated = _iso(created_age), _iso(np.minimum(created_age, _ages(rng, n, 90)))
+    slugs = np.char.replace(np.char.lower(names), ' ', '-')
+    return [
+        {'id': id_, 'name': name, 'logo': f"https://example.com/logos/{slug}.png", 'created_at': c, 'updated_at': u}
+        for id_, name, slug, c, u in zip(_uuids(rng, n), names.tolist(), slugs.tolist(), created.tolist(), updated.tolist())
+    ]
+
+
+def _owners(rng: np.random.Generator, n: int, customer_ids: List[str]) -> List[Optional[str]]:
+    """Assign each record to one of ``customer_ids`` (or none when that list is empty)."""
+    if not customer_ids:
+        return [None] * n
+    return [customer_ids[i] for i in rng.integers(0, len(customer_ids), size=n)]
+
+
+def generate_users(rng: np.random.Generator, n: int, customer_ids: List[str] = ()) -> List[Dict[str, Any]]:
+    emails = np.char.add(np.char.add(rng.choice(FIRST_NAMES, n), '.'), rng.choice(LAST_NAMES, n))
+    emails = np.char.add(emails, rng.integers(1, 100_000, size=n).astype(str))
+    emails = np.char.add(np.char.add(emails, '@'), rng.choice(EMAIL_DOMAINS, n))
+    created = _iso(_ages(rng, n, 2 * 365))
+    return [
+        {'id': id_, 'email': email, 'status': 'active', 'created_at': c, 'updated_at': c,
+         **({'customer_id': owner} if owner else {})}
+        for id_, email, c, owner in zip(_uuids(rng, n), emails.tolist(), created.tolist(), _owners(rng, n, customer_ids))
+    ]
+
+
+def generate_sites(rng: np.random.Generator, n: int, customer_ids: List[str] = (), first: int = 0) -> List[Dict[str, Any]]:
+    """Sites ``site_<first>`` to ``site_<first + n - 1>``."""
+    latitude = np.round(34.0522 + rng.normal(0, 2.0, n), 6)
+    longitude = np.round(-118.2437 + rng.normal(0, 2.0, n), 6)
+    elevation = np.round(rng.gamma(2.0, 250.0, n), 2)
+    soil = rng.choice(SOIL_TYPES, n)
+    created = _iso(_ages(rng, n, 1000))
+    return [
+        {
+            'id': f"site_{first + i}", 'name': f"Research Site {first + i}",
+            'location': {'latitude': Decimal(str(lat)), 'longitude': Decimal(str(lon)), 'elevation': Decimal(str(el))},
+            'soil_type': s, 'created_at': c, 'updated_at': c,
+            **({'customer_id': owner} if owner else {}),
+        }
+        for i, (lat, lon, el, s, c, owner) in enumerate(zip(
+            latitude.tolist(), longitude.tolist(), elevation.tolist(), soil.tolist(), created.tolist(),
+            _owners(rng, n, customer_ids)
+        ))
+    ]
+
+
+def generate_series(
+    rng: np.random.Generator,
+    site_id: str,
+    gt_id: str,
+    start: datetime,
+    first: int,
+    points: int,
+    interval: int,
+    state: Optional[Dict[str, Any]] = None
+):
+    """Readings ``first`` to ``first + points`` of one sensor: daily/seasonal cycles, rain and noise.
+
+    To generate a series in chunks, pass the same ``state`` dict to every
+    chunk, in order: the temperature drift and the drying rain carry over,
+    and each random quantity comes from its own stream, so the series is
+    the same whatever the chunk size.
+    """
+    state = {} if state is None else state
+    if 'streams' not in state:
+        # drift, rain events, rain amounts, moisture noise, conductivity noise
+        state['streams'] = [np.random.default_rng(seed) for seed in rng.integers(0, 2**63, size=5)]
+        state['drift'] = 0.0
+        state['rain'] = np.zeros(0)
+    drift, events, amounts, moisture_noise, conductivity_noise = state['streams']
+
+    t = (first + np.arange(points)) * interval
+    day = 2 * np.pi * t / 86400
+    season = 2 * np.pi * t / (365 * 86400)
+    walk = state['drift'] + drift.normal(0, 0.3, points).cumsum()
+    if points:
+        state['drift'] = float(walk[-1])
+    temperature = 18 + 6 * np.sin(season) + 4 * np.sin(day - np.pi / 2) + walk * 0.02
+    # Rain pulses that decay exponentially: each event adds moisture that dries out over ~2 days
+    rain = np.where(events.random(points) < interval / (5 * 86400), amounts.uniform(0.05, 0.2, points), 0.0)
+    decay = np.exp(-interval / (2 * 86400))
+    kernel = decay ** np.arange(int(10 * 86400 / interval) + 1)
+    # Rain from the previous chunk is still drying out
+    history = np.concatenate([state['rain'], rain])
+    wetness = np.convolve(history, kernel)[len(state['rain']):len(history)]
+    state['rain'] = history[-(len(kernel) - 1):] if len(kernel) > 1 else np.zeros(0)
+    moisture = np.clip(0.18 + wetness + moisture_noise.normal(0, 0.005, points), 0.05, 0.55)
+    conductivity = np.clip(0.05 + 0.4 * moisture + conductivity_noise.normal(0, 0.01, points), 0.01, None)
+
+    if start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    # Same fixed-width UTC format as Measurement.to_item
+    timestamps = np.datetime_as_string(
+        np.datetime64(start, 'us') + t.astype('timedelta64[s]'), unit='us', timezone='UTC'
+    )
+    series_id = f"{site_id}#{gt_id}"
+    return [
+        {
+            'series_id': series_id, 'timestamp': ts, 'site_id': site_id, 'gt_id': gt_id,
+            'values': {'temperature': Decimal(temp), 'moisture': Decimal(moist), 'conductivity': Decimal(cond)},
+        }
+        for ts, temp, moist, cond in zip(
+            timestamps.tolist(),
+            np.char.mod('%.2f', temperature).tolist(),
+            np.char.mod('%.3f', moisture).tolist(),
+            np.char.mod('%.3f', conductivity).tolist(),
+        )
+    ]
+
+
+def create_tables(args):
+    import boto3
+
+    client = boto3.client('dynamodb', region_name=os.getenv('AWS_REGION'))
+    existing = set(client.list_tables()['TableNames'])
+    for env_var, schema in TABLE_SCHEMAS.items():
+        name = os.getenv(env_var)
+        if not name and env_var in OPTIONAL_TABLES:
+            continue
+        if not name:
+            raise SystemExit(f"{env_var} is not set")
+        if name in existing:
+            print(f"Table {name} already exists")
+            continue
+        attributes = {key: 'S' for key, _ in schema['keys']}
+        attributes.update({key: 'S' for keys in schema['indexes'].values() for key in keys})
+        params = {
+            'TableName': name,
+            'KeySchema': [{'AttributeName': key, 'KeyType': kind} for key, kind in schema['keys']],
+            'AttributeDefinitions': [{'AttributeName': key, 'AttributeType': t} for key, t in attributes.items()],
+            'BillingMode': 'PAY_PER_REQUEST',
+        }
+        if schema['indexes']:
+            params['GlobalSecondaryIndexes'] = [
+                {
+                    'IndexName': index,
+                    'KeySchema': [
+                        {'AttributeName': key, 'KeyType': kind} for key, kind in zip(keys, ('HASH', 'RANGE'))
+                    ],
+                    'Projection': {'ProjectionType': 'ALL'},
+                }
+                for index, keys in schema['indexes'].items()
+            ]
+        client.create_table(**params)
+        print(f"Created table {name}")
+
+
+async def _write(table: str, items: List[Dict[str, Any]], key_names, concurrency: int) -> int:
+    from database.dynamodb import dynamodb_client
+
+    unwritten = await dynamodb_client.batch_write_items(table, items, key_names=key_names, max_concurrency=concurrency)
+    if unwritten:
+        print(f"Warning: {len(unwritten)} items could not be written to {table}")
+    return len(items) - len(unwritten)
+
+
+async def _generate(args):
+    from database.dynamodb import DynamoDBClient
+
+    # Worker threads for concurrent BatchWriteItem calls
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency))
+    rng = np.random.default_rng(args.seed)
+
+    # Ids of the customers that sites and users are assigned to
+    owners: List[str] = []
+
+    async def load(label, table, total, generator, key_names=('id',)):
+        written, start = 0, time.perf_counter()
+        for offset in range(0, total, args.chunk_size):
+            items = generator(rng, min(args.chunk_size, total - offset), offset)
+            if table == DynamoDBClient.CUSTOMERS_TABLE and len(owners) < args.owners:
+                owners.extend(item['id'] for item in items[:args.owners - len(owners)])
+            written += await _write(table, items, key_names, args.concurrency)
+        elapsed = time.perf_counter() - start
+        if total:
+            print(f"{label:<13}{written:>12,} items {elapsed:>8.1f}s {written / max(elapsed, 1e-9):>10,.0f} items/s")
+
+    await load('customers', DynamoDBClient.CUSTOMERS_TABLE, args.customers, lambda rng, n, offset: generate_customers(rng, n))
+    await load('users', DynamoDBClient.USERS_TABLE, args.users, lambda rng, n, offset: generate_users(rng, n, owners))
+    await load('sites', DynamoDBClient.SITES_TABLE, args.sites, lambda rng, n, offset: generate_sites(rng, n, owners, offset))
+
+    # Measurements: --series sensors spread round-robin over the sites
+    points = int(args.days * 86400 / args.interval)
+    start_time = NOW - timedelta(days=args.days)
+    written, started = 0, time.perf_counter()
+    for series in range(args.series):
+        site_id, gt_id = f"site_{series % max(args.sites, 1)}", f"gt_{series}"
+        state: Dict[str, Any] = {}
+        for offset in range(0, points, args.chunk_size):
+            count = min(args.chunk_size, points - offset)
+            items = generate_series(rng, site_id, gt_id, start_time, offset, count, args.interval, state)
+            written += await _write(DynamoDBClient.MEASUREMENTS_TABLE, items, ('series_id', 'timestamp'), args.concurrency)
+    if args.series:
+        elapsed = time.perf_counter() - started
+        print(f"{'measurements':<13}{written:>12,} items {elapsed:>8.1f}s {written / max(elapsed, 1e-9):>10,.0f} items/s")
+
+
+def generate(args):
+    asyncio.run(_generate(args))
+
+
+def read_trace(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield requests with ``ts`` relative to the first one."""
+    first = None
+    with open(path) as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+                ts = float(entry['ts'])
+            except (ValueError, KeyError, TypeError):
+                raise SystemExit(f"{path}:{number}: expected a JSON object with 'ts', 'method' and 'path'")
+            first = ts if first is None else first
+            entry['ts'] = ts - first
+            yield entry
+
+
+def replay(args):
+    import requests
+
+    local = threading.local()
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    headers = {'Authorization': f"Bearer {args.token}"} if args.token else {}
+
+    def route_of(path: str) -> str:
+        # Group ids so /customers/<uuid> and /customers/<other uuid> aggregate
+        path = path.split('?')[0]
+        return re.sub(r'/[0-9a-f]{8}-[0-9a-f-]{27}|/(site|gt)_\d+', lambda m: '/{%s}' % (m.group(1) or 'id'), path)
+
+    def send(entry):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = local.session.request(
+                entry['method'], args.base_url.rstrip('/') + entry['path'],
+                json=entry.get('body'), headers={**headers, **entry.get('headers', {})}, timeout=30
+            )
+            status = response.status_code
+        except requests.RequestException:
+            status = 0
+        elapsed = time.perf_counter() - start
+        key = f"{entry['method']} {route_of(entry['path'])}"
+        with lock:
+            latencies[key].append(elapsed)
+            statuses[key][status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for entry in read_trace(args.trace):
+            if args.speed > 0:
+                delay = entry['ts'] / args.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, entry)
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"Replayed {total} requests in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.1f} req/s)")
+    print(f"{'route':<48}{'count':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+    for key in sorted(latencies):
+        values = sorted(latencies[key])
+        pct = lambda p: values[min(int(len(values) * p), len(values) - 1)] * 1000
+        codes = ' '.join(f"{code}:{count}" for code, count in sorted(statuses[key].items()))
+        print(f"{key:<48}{len(values):>8}{pct(0.5):>9.1f}{pct(0.95):>9.1f}{pct(0.99):>9.1f}  {codes}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('create-tables', help='Create the app tables on the configured DynamoDB endpoint')
+
+    gen = commands.add_parser('generate', help='Populate the tables with a seeded synthetic dataset')
+    gen.add_argument('--seed', type=int, default=7)
+    gen.add_argument('--customers', type=int, default=10_000)
+    gen.add_argument('--users', type=int, default=1_000)
+    gen.add_argument('--sites', type=int, default=50)
+    gen.add_argument('--owners', type=int, default=100, help='Customers that the sites and users belong to')
+    gen.add_argument('--series', type=int, default=10, help='Number of ground-truth sensors')
+    gen.add_argument('--days', type=float, default=30, help='Days of readings per sensor')
+    gen.add_argument('--interval', type=int, default=300, help='Seconds between readings')
+    gen.add_argument('--chunk-size', type=int, default=10_000, help='Items generated and written per step')
+    gen.add_argument('--concurrency', type=int, default=16, help='Parallel BatchWriteItem calls')
+
+    rep = commands.add_parser('replay', help='Replay a recorded request trace against the API')
+    rep.add_argument('trace', help='JSON lines trace')
+    rep.add_argument('--base-url', default='http://localhost:8000')
+    rep.add_argument('--token', default=os.getenv('API_TOKEN'), help='Cognito bearer token (or API_TOKEN)')
+    rep.add_argument('--speed', type=float, default=1.0, help='Replay speed multiplier, 0 for as fast as possible')
+    rep.add_argument('--concurrency', type=int, default=16)
+
+    args = parser.parse_args(argv)
+    {'create-tables': create_tables, 'generate': generate, 'replay': replay}[args.command](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,38 +1,66 @@
 import os
-import boto3
 from datetime import datetime
 
+import boto3
+from botocore.exceptions import ClientError
+
+# Created on first use and reused by every warm invocation of this container
+_dynamodb_client = None
+
+
+def get_dynamodb_client():
+    """Lazily build the low-level DynamoDB client (cheaper than boto3.resource)."""
+    global _dynamodb_client
+    if _dynamodb_client is None:
+        _dynamodb_client = boto3.client('dynamodb')
+    return _dynamodb_client
+
+
+def create_user_record(user_id: str, email: str) -> bool:
+    """Write the user record once; returns False if it already exists.
+
+    The write is conditional on ``id`` (the Cognito ``sub``) so retried
+    trigger invocations never overwrite the record created by the first.
+    """
+    now = datetime.utcnow().isoformat()
+    try:
+        get_dynamodb_client().put_item(
+            TableName=os.environ['DYNAMODB_USERS_TABLE'],
+            Item={
+                'id': {'S': user_id},
+                'email': {'S': email},
+                'created_at': {'S': now},
+                'updated_at': {'S': now},
+                'status': {'S': 'active'}
+            },
+            ConditionExpression='attribute_not_exists(id)'
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
 def handler(event, context):
     try:
         # Extract user attributes from the Cognito event
         user_attributes = event['request']['userAttributes']
-        
+
         # Get the user's sub (unique identifier) and email
-        user_id = user_attributes.get('sub')
+        user_id = user_attributes['sub']
         email = user_attributes.get('email', '').lower()
-        
-        # Initialize DynamoDB client
-        dynamodb = boto3.resource('dynamodb')
-        users_table = dynamodb.Table(os.environ['DYNAMODB_USERS_TABLE'])
-        
-        # Create user record
-        user_record = {
-            'id': user_id,
-            'email': email,
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat(),
-            'status': 'active'
-        }
-        
-        # Store in DynamoDB
-        users_table.put_item(Item=user_record)
-        
-        print(f"Successfully created user record for {email}")
-        
+
+        if create_user_record(user_id, email):
+            print(f"Successfully created user record for {email}")
+        else:
+            print(f"User record for {email} already exists, skipping")
+
         # Return the event object back to Cognito
         return event
-        
+
     except Exception as e:
+        # Fail the trigger so the error surfaces (and Cognito retries) instead
+        # of silently losing the user record
         print(f'Error in post-signup handler: {str(e)}')
-        # Still return the event to allow the user to be created in Cognito
-        return event 
\ No newline at end of file
+        raise
@@ -1,14 +1,19 @@
+# Pure string checks only: this trigger imports nothing so cold starts stay minimal
+ALLOWED_DOMAIN_KEYWORD = 'gmail'
+
+
 def handler(event, context):
     try:
         # Get the email from the request
         email = event['request']['userAttributes'].get('email', '').lower()
-        
-        # Check if email contains 'psm'
-        if 'gmail' not in email.split('@')[1]:
-            raise Exception('Email domain must contain "psm"')
-            
+
+        # Check if the email domain contains the allowed keyword
+        _, _, domain = email.rpartition('@')
+        if ALLOWED_DOMAIN_KEYWORD not in domain:
+            raise Exception(f'Email domain must contain "{ALLOWED_DOMAIN_KEYWORD}"')
+
         # Return the event object back to Cognito
         return event
-        
+
     except Exception as e:
-        raise Exception(f'Error in pre-signup validation: {str(e)}') 
\ No newline at end of file
+        raise Exception(f'Error in pre-signup validation: {str(e)}')
@@ -0,0 +1,158 @@
+"""Invoke the Cognito trigger handlers locally and report cold/warm cost.
+
+Each cold invocation runs in a fresh Python process, like a new Lambda
+execution environment: it imports the handler module, then invokes it. Warm
+invocations reuse that process. DynamoDB is served by a local stand-in:
+AWS_ENDPOINT_URL_DYNAMODB if set (e.g. DynamoDB Local), otherwise an
+in-process moto server.
+
+Usage (from cdk/lambda/):
+    python invoke_auth_local.py [--cold-starts 5] [--warm 200]
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+
+HANDLERS = {
+    'pre-signup': 'validate_email',
+    'post-confirmation': 'create_user',
+}
+USERS_TABLE = 'local-users'
+
+# Runs inside the child process; prints one JSON line of measurements
+CHILD_SCRIPT = r"""
+import json, resource, sys, time, uuid
+sys.path.insert(0, 'auth')
+
+start = time.perf_counter()
+module = __import__(sys.argv[1])
+import_ms = (time.perf_counter() - start) * 1000
+
+def event():
+    return {
+        'triggerSource': 'PostConfirmation_ConfirmSignUp',
+        'request': {'userAttributes': {'sub': str(uuid.uuid4()), 'email': 'Someone@Gmail.com'}},
+        'response': {},
+    }
+
+start = time.perf_counter()
+module.handler(event(), None)
+first_ms = (time.perf_counter() - start) * 1000
+
+warm = []
+for _ in range(int(sys.argv[2])):
+    e = event()
+    start = time.perf_counter()
+    module.handler(e, None)
+    warm.append((time.perf_counter() - start) * 1000)
+
+# Idempotency: replaying the same event must not fail or overwrite
+replay = event()
+module.handler(replay, None)
+module.handler(replay, None)
+
+# Peak RSS of this process; ru_maxrss would include the pre-exec parent on Linux
+try:
+    with open('/proc/self/status') as f:
+        max_rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+except OSError:
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+print(json.dumps({
+    'import_ms': import_ms,
+    'first_invoke_ms': first_ms,
+    'warm_ms': warm,
+    'max_rss_kb': max_rss_kb,
+    'modules': len(sys.modules),
+}))
+"""
+
+
+def start_dynamodb_stand_in():
+    if os.getenv('AWS_ENDPOINT_URL_DYNAMODB'):
+        return None, os.environ['AWS_ENDPOINT_URL_DYNAMODB']
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise SystemExit("Set AWS_ENDPOINT_URL_DYNAMODB or install 'moto[server]'")
+    # Keep the stand-in's request log out of the report
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return server, f"http://{host}:{port}"
+
+
+def create_users_table(env):
+    import boto3
+
+    client = boto3.client(
+        'dynamodb',
+        endpoint_url=env['AWS_ENDPOINT_URL_DYNAMODB'],
+        region_name=env['AWS_DEFAULT_REGION'],
+        aws_access_key_id=env['AWS_ACCESS_KEY_ID'],
+        aws_secret_access_key=env['AWS_SECRET_ACCESS_KEY']
+    )
+    if USERS_TABLE not in client.list_tables()['TableNames']:
+        client.create_table(
+            TableName=USERS_TABLE,
+            KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cold-starts', type=int, default=5)
+    parser.add_argument('--warm', type=int, default=200)
+    args = parser.parse_args()
+
+    server, endpoint = start_dynamodb_stand_in()
+    env = dict(
+        os.environ,
+        AWS_ENDPOINT_URL_DYNAMODB=endpoint,
+        AWS_DEFAULT_REGION=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
+        AWS_ACCESS_KEY_ID=os.getenv('AWS_ACCESS_KEY_ID', 'local'),
+        AWS_SECRET_ACCESS_KEY=os.getenv('AWS_SECRET_ACCESS_KEY', 'local'),
+        DYNAMODB_USERS_TABLE=USERS_TABLE,
+    )
+    try:
+        create_users_table(env)
+        here = os.path.dirname(os.path.abspath(__file__))
+
+        print(f"DynamoDB stand-in: {endpoint}")
+        print(f"{'trigger':<18}{'import ms':>10}{'1st call':>10}{'cold ms':>9}{'warm p50':>10}{'warm p99':>10}{'RSS MB':>8}{'modules':>9}")
+        for trigger, module in HANDLERS.items():
+            runs = []
+            for _ in range(args.cold_starts):
+                output = subprocess.run(
+                    [sys.executable, '-c', CHILD_SCRIPT, module, str(args.warm)],
+                    cwd=here, env=env, capture_output=True, text=True, check=True
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+
+            import_ms = statistics.median(r['import_ms'] for r in runs)
+            first_ms = statistics.median(r['first_invoke_ms'] for r in runs)
+            warm = [ms for r in runs for ms in r['warm_ms']]
+            rss_mb = statistics.median(r['max_rss_kb'] for r in runs) / 1024
+            print(
+                f"{trigger:<18}{import_ms:>10.1f}{first_ms:>10.1f}{import_ms + first_ms:>9.1f}"
+                f"{percentile(warm, 0.5):>10.2f}{percentile(warm, 0.99):>10.2f}{rss_mb:>8.1f}{runs[0]['modules']:>9}"
+            )
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
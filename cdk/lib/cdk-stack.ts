@@ -56,6 +56,8 @@ export class CdkStack extends cdk.Stack {
           DYNAMODB_USERS_TABLE: dynamoDB.usersTable.tableName,
           DYNAMODB_SITES_TABLE: dynamoDB.sitesTable.tableName,
           DYNAMODB_CUSTOMERS_TABLE: dynamoDB.customersTable.tableName,
+          DYNAMODB_MEASUREMENTS_TABLE: dynamoDB.measurementsTable.tableName,
+          DYNAMODB_SINGLE_TABLE: dynamoDB.singleTable.tableName,
         },
       });
 
@@ -63,6 +65,8 @@ export class CdkStack extends cdk.Stack {
       dynamoDB.usersTable.grantReadWriteData(appRunner.service);
       dynamoDB.sitesTable.grantReadWriteData(appRunner.service);
       dynamoDB.customersTable.grantReadWriteData(appRunner.service);
+      dynamoDB.measurementsTable.grantReadWriteData(appRunner.service);
+      dynamoDB.singleTable.grantReadWriteData(appRunner.service);
 
       // Create Amplify app for frontend
       const amplifyApp = new AmplifyApp(this, "FrontendApp", {
@@ -37,6 +37,10 @@ export class DynamoDBConstruct extends Construct {
           indexName: "email-index",
           partitionKey: "email",
         },
+        {
+          indexName: "customer-index",
+          partitionKey: "customer_id",
+        },
       ],
     },
     {
@@ -48,6 +52,10 @@ export class DynamoDBConstruct extends Construct {
           indexName: "name-index",
           partitionKey: "name",
         },
+        {
+          indexName: "customer-index",
+          partitionKey: "customer_id",
+        },
       ],
     },
     {
@@ -61,6 +69,27 @@ export class DynamoDBConstruct extends Construct {
         },
       ],
     },
+    {
+      // Sensor readings, one item per point: series_id is "<site_id>#<gt_id>"
+      name: "measurements",
+      envSuffix: "measurements",
+      partitionKey: "series_id",
+      sortKey: "timestamp",
+    },
+    {
+      // Customers, sites and users as an adjacency list (see backend/database/single_table.py)
+      name: "single",
+      envSuffix: "single",
+      partitionKey: "PK",
+      sortKey: "SK",
+      indexes: [
+        {
+          indexName: "inverted-index",
+          partitionKey: "SK",
+          sortKey: "PK",
+        },
+      ],
+    },
   ];
 
   constructor(scope: Construct, id: string, props: DynamoDBProps) {
@@ -148,4 +177,12 @@ export class DynamoDBConstruct extends Construct {
   public get customersTable(): dynamodb.Table {
     return this.getTable("customers");
   }
+
+  public get measurementsTable(): dynamodb.Table {
+    return this.getTable("measurements");
+  }
+
+  public get singleTable(): dynamodb.Table {
+    return this.getTable("single");
+  }
 }